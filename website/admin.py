@@ -1,17 +1,238 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import *
+from . import aggregates, importers
+
+
+class EstimatedCountPaginator(Paginator):
+    """Reads the size of an unfiltered table from the planner statistics.
+
+    COUNT(*) has to scan the whole table on PostgreSQL, which takes seconds
+    over millions of grades. Filtered lists (and other databases) still get
+    an exact count.
+    """
+    # below this an exact count is cheap enough
+    EXACT_COUNT_LIMIT = 100_000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        connection = connections[getattr(self.object_list, 'db', 'default')]
+
+        if (query is not None and not query.where
+                and connection.vendor == 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [query.model._meta.db_table])
+                row = cursor.fetchone()
+            # -1 (or nothing) until the table has been analyzed
+            if row and row[0] > self.EXACT_COUNT_LIMIT:
+                return int(row[0])
+
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """Changelist settings for tables with millions of rows.
+
+    Subclasses name the relations their columns use in
+    ``list_select_related`` and edit foreign keys with ``raw_id_fields``,
+    so a page costs the same few queries whatever the table size.
+    """
+    paginator = EstimatedCountPaginator
+    # skips the second COUNT(*) of the whole table
+    show_full_result_count = False
+    # newest first, along the primary key index
+    ordering = ('-pk',)
+
+
+class GradeAggregateAdminMixin:
+    """Keeps GradeAggregate in sync when grades are edited from the admin."""
+
+    def affected_students(self, queryset):
+        """Ids of the students whose grades the rows of ``queryset`` hold."""
+        return queryset.values_list('student_id', flat=True)
+
+    def _refresh_aggregates(self, before, queryset=None):
+        after = set()
+        if queryset is not None:
+            after = set(self.affected_students(queryset))
+        aggregates.rebuild(set(before) | after)
+
+    def save_model(self, request, obj, form, change):
+        queryset = self.model.objects.filter(pk=obj.pk)
+        before = list(self.affected_students(queryset)) if change else []
+        super().save_model(request, obj, form, change)
+        self._refresh_aggregates(before, self.model.objects.filter(pk=obj.pk))
+
+    def delete_model(self, request, obj):
+        queryset = self.model.objects.filter(pk=obj.pk)
+        before = list(self.affected_students(queryset))
+        super().delete_model(request, obj)
+        self._refresh_aggregates(before)
+
+    def delete_queryset(self, request, queryset):
+        before = list(self.affected_students(queryset))
+        super().delete_queryset(request, queryset)
+        self._refresh_aggregates(before)
+
+
+@admin.register(Grade)
+class GradeAdmin(GradeAggregateAdminMixin, LargeTableAdminMixin,
+                 admin.ModelAdmin):
+    list_display = ('id', 'student', 'subject', 'grade', 'date',
+                    'evaluation_type')
+    list_select_related = ('student__user', 'subject')
+    raw_id_fields = ('student', 'exam')
+    date_hierarchy = 'date'
+    list_filter = ('subject',)
+
+
+@admin.register(StudentGrade)
+class StudentGradeAdmin(GradeAggregateAdminMixin, LargeTableAdminMixin,
+                        admin.ModelAdmin):
+    list_select_related = ('student__user', 'grade')
+    raw_id_fields = ('student', 'grade')
+
+
+@admin.register(SubjectGrade)
+class SubjectGradeAdmin(GradeAggregateAdminMixin, LargeTableAdminMixin,
+                        admin.ModelAdmin):
+    list_select_related = ('subject', 'grade')
+    raw_id_fields = ('grade',)
+    list_filter = ('subject',)
+
+    def affected_students(self, queryset):
+        return Grade.objects.filter(
+            pk__in=queryset.values('grade')).values_list('student_id', flat=True)
+
+
+@admin.register(GradeAggregate)
+class GradeAggregateAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('student', 'subject', 'count', 'total',
+                    'minimum', 'maximum', 'last_date')
+    list_select_related = ('student__user', 'subject')
+    raw_id_fields = ('student',)
+
+
+@admin.register(Absence)
+class AbsenceAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'student', 'subject', 'date', 'time',
+                    'recorded_by')
+    list_select_related = ('student__user', 'subject', 'recorded_by__user')
+    raw_id_fields = ('student', 'recorded_by')
+    date_hierarchy = 'date'
+    list_filter = ('subject',)
+
+
+@admin.register(ScheduleEntry)
+class ScheduleEntryAdmin(admin.ModelAdmin):
+    list_display = ('classroom', 'weekday', 'start_time', 'subject',
+                    'teacher')
+    list_select_related = ('classroom', 'subject', 'teacher__user')
+    raw_id_fields = ('teacher',)
+    list_filter = ('classroom__school', 'weekday')
+    ordering = ('classroom', 'weekday', 'slot')
+
+
+class ImportForm(forms.Form):
+    kind = forms.ChoiceField(label="Tip", choices=[
+        ('students', "Elevi"),
+        ('timetable', "Orar"),
+        ('grades', "Note"),
+    ])
+    file = forms.FileField(label="Fișier CSV")
+    dry_run = forms.BooleanField(
+        label="Doar verifică fișierul, fără să salveze", required=False)
+
+
+@admin.register(School)
+class SchoolAdmin(admin.ModelAdmin):
+    actions = ['import_csv']
+
+    @admin.action(description="Importă elevi, orar sau note din CSV")
+    def import_csv(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(
+                request, "Selectează o singură școală.", messages.ERROR)
+            return None
+        school = queryset.get()
+
+        if 'apply' in request.POST:
+            form = ImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                report = importers.run_import(
+                    form.cleaned_data['kind'],
+                    io.TextIOWrapper(upload.file, encoding='utf-8-sig',
+                                     newline=''),
+                    school,
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+                level = messages.SUCCESS if report.ok else messages.ERROR
+                for line in report.lines():
+                    self.message_user(request, line, level)
+                return None
+        else:
+            form = ImportForm()
+
+        return render(request, 'admin/website/import_csv.html', {
+            **self.admin_site.each_context(request),
+            'title': f"Import CSV în {school}",
+            'opts': self.model._meta,
+            'school': school,
+            'form': form,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at',
+                    'updated_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('key', 'created_at', 'updated_at')
+    actions = ['retry']
+
+    @admin.action(description="Reia joburile selectate")
+    def retry(self, request, queryset):
+        # a failed job whose twin is already queued stays as it is, and of
+        # several failed twins only the latest is queued again
+        queued = Job.objects.filter(status=Job.PENDING).values('key')
+        latest = {}
+        for pk, key in (
+            queryset.filter(status=Job.FAILED).exclude(key__in=queued)
+            .order_by('pk').values_list('pk', 'key')
+        ):
+            latest[key] = pk
+
+        try:
+            with transaction.atomic():
+                count = Job.objects.filter(pk__in=latest.values()).update(
+                    status=Job.PENDING, attempts=0, run_at=timezone.now())
+        except IntegrityError:
+            # an identical job was queued meanwhile
+            self.message_user(
+                request, "Un job identic a fost pus în coadă între timp; "
+                "încearcă din nou.", messages.WARNING)
+            return
+        self.message_user(request, f"{count} joburi repuse în coadă.")
+
 
 admin.site.register(StudentProfile)
 admin.site.register(TeacherProfile)
-admin.site.register(School)
 admin.site.register(Classroom)
 admin.site.register(Subject)
-admin.site.register(Grade)
-admin.site.register(ScheduleEntry)
-admin.site.register(StudentGrade)
-admin.site.register(SubjectGrade)
-admin.site.register(Absence)
 
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
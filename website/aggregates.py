@@ -0,0 +1,135 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from .models import Grade, GradeAggregate
+
+
+def record_grade(grade):
+    """Fold a newly created grade into its student's aggregates.
+
+    Must be called inside the transaction that created the grade so the
+    aggregates never disagree with the raw rows.
+    """
+    for subject_id in (grade.subject_id, None):
+        aggregate, created = (
+            GradeAggregate.objects
+            .select_for_update()
+            .get_or_create(
+                student_id=grade.student_id,
+                subject_id=subject_id,
+                defaults={
+                    'count': 1,
+                    'total': grade.grade,
+                    'minimum': grade.grade,
+                    'maximum': grade.grade,
+                    'last_date': grade.date,
+                },
+            )
+        )
+        if created:
+            continue
+
+        aggregate.count += 1
+        aggregate.total += grade.grade
+        aggregate.minimum = min(aggregate.minimum or grade.grade, grade.grade)
+        aggregate.maximum = max(aggregate.maximum or grade.grade, grade.grade)
+        aggregate.last_date = max(aggregate.last_date or grade.date, grade.date)
+        aggregate.save()
+
+
+def _summaries(grades, *group_by):
+    return (
+        grades
+        .values(*group_by)
+        .annotate(
+            count=Count('id'),
+            total=Sum('grade'),
+            minimum=Min('grade'),
+            maximum=Max('grade'),
+            last_date=Max('date'),
+        )
+        .order_by()
+    )
+
+
+@transaction.atomic
+def rebuild(student_ids=None):
+    """Recompute aggregates from the raw grade rows.
+
+    Rebuilds every student when ``student_ids`` is None, otherwise only the
+    given ones. Used after edits and deletes, which cannot be applied
+    incrementally (the minimum or maximum may disappear).
+    """
+    grades = Grade.objects.filter(student__isnull=False)
+    existing = GradeAggregate.objects.all()
+
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        if not student_ids:
+            return 0
+        grades = grades.filter(student__in=student_ids)
+        existing = existing.filter(student__in=student_ids)
+
+    existing.delete()
+
+    rows = []
+    per_subject = _summaries(
+        grades.filter(subject__isnull=False), 'student', 'subject')
+    for row in per_subject:
+        rows.append(GradeAggregate(
+            student_id=row.pop('student'),
+            subject_id=row.pop('subject'),
+            **row
+        ))
+
+    for row in _summaries(grades, 'student'):
+        rows.append(GradeAggregate(
+            student_id=row.pop('student'),
+            subject=None,
+            **row
+        ))
+
+    GradeAggregate.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def subject_averages(students, subjects=None, overall=False):
+    """Average and number of grades per subject of each student.
+
+    ``students`` (and ``subjects``, to keep only these) are ids or
+    querysets. The dashboard, the grades page and the class catalog all
+    read their averages here. Returns ``{student id: {subject id:
+    {'name', 'count', 'average', 'minimum', 'maximum'}}}``, read from the
+    per-subject aggregates in one query, so it agrees with the ranks; with
+    ``overall`` the student's overall row is included under ``None``.
+    """
+    rows = (
+        GradeAggregate.objects
+        .filter(student__in=students, count__gt=0)
+        .select_related('subject')
+        .order_by('student', 'subject')
+    )
+    if subjects is not None:
+        rows = rows.filter(subject__in=subjects)
+    elif not overall:
+        rows = rows.filter(subject__isnull=False)
+
+    averages = defaultdict(dict)
+    for row in rows:
+        averages[row.student_id][row.subject_id] = {
+            'name': row.subject.name if row.subject else None,
+            'count': row.count,
+            'average': row.average,
+            'minimum': row.minimum,
+            'maximum': row.maximum,
+        }
+    return averages
+
+
+def best_subject(averages):
+    """The subject with the highest average in one student's
+    ``subject_averages`` (the first one on a tie), or None."""
+    return max((row for subject_id, row in averages.items() if subject_id),
+               key=lambda row: row['average'], default=None)
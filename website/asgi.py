@@ -1,3 +1,14 @@
+"""ASGI entry point.
+
+Serve with any ASGI server, for example
+
+    ASYNC_VIEWS=1 uvicorn website.asgi:application --workers 4
+
+One worker then keeps many slow clients waiting on the event loop instead
+of holding a thread each. With ASYNC_VIEWS on, the student dashboard and
+exam feed load their sections concurrently on worker threads, each with its
+own database connection, so size DB_POOL_MAX_SIZE for that.
+"""
 
 import os
 
@@ -0,0 +1,96 @@
+from datetime import date
+
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+from . import caching
+from .models import Absence, ScheduleEntry
+
+
+# Statistics depend on today's date (school weeks elapsed), so they are
+# not kept forever even when no absence changes.
+CACHE_TIMEOUT = 60 * 60
+
+
+def school_year_start(today):
+    """1 September of the school year ``today`` belongs to."""
+    year = today.year if today.month >= 9 else today.year - 1
+    return date(year, 9, 1)
+
+
+def compute_stats(student, today=None):
+    """Absence totals, per-month counts and per-subject rates for a student.
+
+    Each breakdown is a single GROUP BY query; rates compare this school
+    year's absences with the lessons the timetable scheduled so far.
+    """
+    today = today or date.today()
+    year_start = school_year_start(today)
+    weeks_elapsed = (today - year_start).days // 7 + 1
+
+    absences = Absence.objects.filter(student=student).order_by()
+
+    per_month = [
+        {'month': row['month'], 'count': row['count']}
+        for row in absences
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(count=Count('id'))
+        .order_by('month')
+    ]
+
+    per_subject_rows = (
+        absences
+        .values('subject', 'subject__name')
+        .annotate(
+            count=Count('id'),
+            this_year=Count('id', filter=Q(date__gte=year_start)),
+        )
+        .order_by('-count', 'subject__name')
+    )
+
+    weekly_lessons = {}
+    if student.classroom_id:
+        weekly_lessons = dict(
+            ScheduleEntry.objects
+            .filter(classroom_id=student.classroom_id)
+            .values('subject')
+            .annotate(lessons=Count('id'))
+            .values_list('subject', 'lessons')
+        )
+
+    per_subject = []
+    for row in per_subject_rows:
+        scheduled = weekly_lessons.get(row['subject'], 0) * weeks_elapsed
+        rate = row['this_year'] / scheduled * 100 if scheduled else None
+        per_subject.append({
+            'subject': row['subject__name'],
+            'count': row['count'],
+            'scheduled': scheduled,
+            'rate': rate,
+        })
+
+    this_month = today.replace(day=1)
+    monthly = sum(
+        row['count'] for row in per_month if row['month'] == this_month)
+
+    most_missed = next(
+        (row['subject'] for row in per_subject if row['subject']), None)
+
+    return {
+        'total': sum(row['count'] for row in per_month),
+        'monthly': monthly,
+        'most_missed_subject': most_missed,
+        'per_month': per_month,
+        'per_subject': per_subject,
+    }
+
+
+def get_stats(student):
+    """Cached ``compute_stats``; rebuilt when an absence or the timetable changes."""
+    return caching.get_or_build(
+        f"attendance:{student.id}",
+        [('absences', student.id), ('schedule', student.classroom_id)],
+        lambda: compute_stats(student),
+        CACHE_TIMEOUT,
+    )
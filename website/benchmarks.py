@@ -0,0 +1,44 @@
+"""Helpers shared by the benchmark management commands."""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Run the block against a freshly migrated, throwaway test database.
+
+    Benchmarks seed large datasets and drop indexes, so they never touch
+    the configured database itself.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def analyze():
+    """Refresh planner statistics after bulk loads or schema changes."""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def timed(func, repeat):
+    """Run ``func`` ``repeat`` times and return the durations in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
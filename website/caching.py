@@ -0,0 +1,107 @@
+"""Versioned cache entries, invalidated by model signals.
+
+Every cached value names the data it was built from as ``(source, id)``
+pairs, e.g. ``('grades', student_id)`` or ``('schedule', classroom_id)``.
+Each pair has a version in the cache and the versions are part of the
+value's key. Saving or deleting a row bumps the versions of its pairs (see
+signals.py), so every value built from the old data gets a new key: stale
+entries are never read again and simply expire. This only holds if every
+process that writes shares the cache (see CACHES in settings.py).
+
+Sources:
+    grades        student id    a student's grades
+    class-grades  classroom id  any grade in the classroom (rankings)
+    absences      student id    a student's absences
+    exams         classroom id  a classroom's exams
+    schedule      classroom id  a classroom's timetable
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import StudentProfile
+
+
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+_MISSING = object()
+
+
+def _version_key(source, scope_id):
+    return f"version:{source}:{scope_id}"
+
+
+def _new_version():
+    # Versions only have to differ from the earlier ones, and a clock value
+    # does even when the previous version was evicted from the cache.
+    return time.time_ns()
+
+
+def versions(deps):
+    """Current version of each ``(source, id)`` pair, in one cache round trip."""
+    keys = [_version_key(*dep) for dep in deps]
+    found = cache.get_many(keys)
+
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_version(), None)
+        # another process may have added its own version first
+        found.update(cache.get_many(missing))
+
+    return [found.get(key, 0) for key in keys]
+
+
+def bump(*deps):
+    """Invalidate every value built from the given ``(source, id)`` pairs.
+
+    Deferred until the current transaction commits: bumping earlier would
+    let a concurrent request cache the old rows under the new version.
+    """
+    keys = [_version_key(*dep) for dep in deps]
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many(dict.fromkeys(keys, _new_version()), None))
+
+
+def get_or_build(name, deps, build, timeout=DEFAULT_TIMEOUT):
+    """Return the cached ``build()`` for ``name`` at the current ``deps`` versions."""
+    stamp = ".".join(str(version) for version in versions(deps))
+    key = f"{name}@{stamp}"
+
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+# ===== INVALIDATION HELPERS =====
+
+def grades_changed(student_ids):
+    """A grade of these students was added, edited or removed."""
+    student_ids = {student_id for student_id in student_ids if student_id}
+    if not student_ids:
+        return
+
+    classroom_ids = set(
+        StudentProfile.objects
+        .filter(id__in=student_ids, classroom__isnull=False)
+        .values_list('classroom_id', flat=True)
+    )
+    bump(*[('grades', student_id) for student_id in student_ids],
+         *[('class-grades', classroom_id) for classroom_id in classroom_ids])
+
+
+def absences_changed(student_ids):
+    bump(*[('absences', student_id)
+           for student_id in set(student_ids) if student_id])
+
+
+def exams_changed(classroom_id):
+    bump(('exams', classroom_id))
+
+
+def schedule_changed(classroom_id):
+    bump(('schedule', classroom_id))
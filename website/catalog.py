@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from .aggregates import subject_averages
+from .models import Grade
+
+
+def build_catalog(classroom, students, subjects):
+    """Rows of the class catalog: every student with their grades and
+    average per subject.
+
+    All grades of the classroom for the given subjects are fetched in a
+    single query and grouped in memory, and the averages come from
+    ``subject_averages`` in one more, so the cost does not depend on the
+    number of students.
+    """
+    grades = (
+        Grade.objects
+        .filter(student__classroom=classroom, subject__in=subjects)
+        .select_related("exam")
+        .order_by("date", "id")
+    )
+
+    cells = defaultdict(list)
+    for grade in grades:
+        cells[(grade.student_id, grade.subject_id)].append(grade)
+
+    averages = subject_averages(students, subjects)
+
+    catalog = []
+
+    for student in students:
+        row = []
+        for subject in subjects:
+            cell = cells.get((student.id, subject.id), [])
+            row.append({
+                "subject": subject,
+                "grades": cell,
+                "average": averages[student.id].get(
+                    subject.id, {}).get("average"),
+            })
+        catalog.append({"student": student, "subjects": row})
+
+    return catalog
@@ -0,0 +1,120 @@
+"""Sections of the student dashboard, each cached with website.caching.
+
+A section only depends on one kind of data, so a new grade does not throw
+away the timetable part of the page and vice versa. Date-dependent sections
+carry the day in their name. Today's lessons come from the timetable's
+in-memory index (website.timetable) and the "This week" panel from its
+snapshot table (website.weekly_stats).
+"""
+import asyncio
+from datetime import timedelta
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from . import aggregates, caching, timetable, weekly_stats
+from .models import Exams
+from .ranking import student_rank
+
+
+def schedule_section(classroom_id, weekday):
+    """Today's lessons, from the in-memory timetable index."""
+    return list(timetable.lessons_on(classroom_id, weekday))
+
+
+def exams_section(classroom_id, today):
+    """Number of exams in the next 7 days."""
+    def build():
+        return Exams.objects.filter(
+            classroom_id=classroom_id,
+            date__gte=today,
+            date__lte=today + timedelta(days=7)
+        ).count()
+
+    return caching.get_or_build(
+        f"dashboard-exams:{classroom_id}:{today}",
+        [('exams', classroom_id)], build)
+
+
+def grades_section(student):
+    """Overall average and best subject."""
+    def build():
+        averages = aggregates.subject_averages(
+            [student.id], overall=True)[student.id]
+        best = aggregates.best_subject(averages)
+
+        return {
+            'average_grade': averages.get(None, {}).get('average', 0),
+            'best_subject_name': best['name'] if best else "N/A",
+            'best_subject_avg': best['average'] if best else 0,
+        }
+
+    return caching.get_or_build(
+        f"dashboard-grades:{student.id}",
+        [('grades', student.id)], build)
+
+
+def rank_section(student):
+    """``(rank, total)`` of the student in their classroom."""
+    return caching.get_or_build(
+        f"dashboard-rank:{student.id}:{student.classroom_id}",
+        [('class-grades', student.classroom_id)],
+        lambda: student_rank(student))
+
+
+def week_section(student, now):
+    """The "This week" panel, from the student's WeeklyStats snapshot."""
+    stats = weekly_stats.get(student, now.date())
+    return {
+        'classes': len(stats.lessons),
+        'exams': stats.exams,
+        'grades': stats.grades,
+        'attendance': weekly_stats.attendance(stats, now),
+    }
+
+
+def sections(student, now):
+    """The dashboard sections of ``student``, as callables by name.
+
+    They share no state, so they can run one after the other or all at once
+    (see ``gather``).
+    """
+    builders = {
+        'grades': partial(grades_section, student),
+        'rank': partial(rank_section, student),
+        'week': partial(week_section, student, now),
+    }
+
+    if student.classroom_id:
+        builders['schedule'] = partial(
+            schedule_section, student.classroom_id, now.weekday())
+        builders['exams'] = partial(
+            exams_section, student.classroom_id, now.date())
+
+    return builders
+
+
+def _in_worker(build):
+    def run():
+        try:
+            return build()
+        finally:
+            # Worker threads are not part of the request cycle, so recycle
+            # their connection like request_finished would.
+            close_old_connections()
+    return run
+
+
+async def gather(builders):
+    """Run ``sections`` concurrently and return their results by name.
+
+    Django's async ORM runs queries on one thread per request, one after
+    the other, so each section runs on its own worker thread (and database
+    connection) instead.
+    """
+    results = await asyncio.gather(*(
+        sync_to_async(_in_worker(build), thread_sensitive=False)()
+        for build in builders.values()
+    ))
+    return dict(zip(builders, results))
@@ -1,26 +1,106 @@
+from asgiref.sync import iscoroutinefunction
 from django.shortcuts import redirect
 from functools import wraps
 
+from .models import StudentProfile, TeacherProfile
 
-def teacher_required(view_func):
 
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        user = request.user
-        if user.is_authenticated and hasattr(user, 'teacherprofile'):
-            return view_func(request, *args, **kwargs)
+ROLE_SESSION_KEY = 'role'
 
-        return redirect('home')
-    return _wrapped_view
+PROFILE_MODELS = {
+    'teacher': TeacherProfile,
+    'student': StudentProfile,
+}
 
 
-def student_required(view_func):
+def _cached_role(request):
+    if hasattr(request, 'role'):
+        return True
+    request.role = request.teacher = request.student = None
+    return False
 
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        user = request.user
-        if user.is_authenticated and hasattr(user, 'studentprofile'):
-            return view_func(request, *args, **kwargs)
 
-        return redirect('home')
-    return _wrapped_view
+def _roles_to_try(cached):
+    # the role remembered in the session first, the others as a fallback
+    return sorted(PROFILE_MODELS, key=lambda role: role != cached)
+
+
+def _attach(request, user, role, profile):
+    # reuse the authenticated user (this also fills user.<role>profile)
+    profile.user = user
+    setattr(request, role, profile)
+    request.role = role
+
+
+def resolve_role(request):
+    """Load the logged-in user's profile once and attach it to the request.
+
+    Sets ``request.role`` ('teacher', 'student' or None) and
+    ``request.teacher`` / ``request.student``. The role is remembered in the
+    session, so later requests fetch the profile with a single query.
+    """
+    if _cached_role(request):
+        return request.role
+
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    cached = request.session.get(ROLE_SESSION_KEY)
+    for role in _roles_to_try(cached):
+        profile = PROFILE_MODELS[role].objects.filter(user=user).first()
+        if profile is not None:
+            _attach(request, user, role, profile)
+            if cached != role:
+                request.session[ROLE_SESSION_KEY] = role
+            break
+
+    return request.role
+
+
+async def aresolve_role(request):
+    """``resolve_role`` for async views."""
+    if _cached_role(request):
+        return request.role
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+
+    cached = await request.session.aget(ROLE_SESSION_KEY)
+    for role in _roles_to_try(cached):
+        profile = await PROFILE_MODELS[role].objects.filter(user=user).afirst()
+        if profile is not None:
+            _attach(request, user, role, profile)
+            if cached != role:
+                await request.session.aset(ROLE_SESSION_KEY, role)
+            break
+
+    return request.role
+
+
+def _role_required(role):
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                if await aresolve_role(request) == role:
+                    return await view_func(request, *args, **kwargs)
+
+                return redirect('home')
+        else:
+
+            @wraps(view_func)
+            def _wrapped_view(request, *args, **kwargs):
+                if resolve_role(request) == role:
+                    return view_func(request, *args, **kwargs)
+
+                return redirect('home')
+        return _wrapped_view
+    return decorator
+
+
+teacher_required = _role_required('teacher')
+student_required = _role_required('student')
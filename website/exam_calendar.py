@@ -0,0 +1,77 @@
+import hashlib
+from datetime import date, datetime
+
+from django.db.models import Count, Max
+
+from . import caching
+from .models import Exams
+
+
+def parse_month(value):
+    """Parse ``YYYY-MM`` into the first day of that month (today's by default)."""
+    if not value:
+        return date.today().replace(day=1)
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def shift_month(month, delta):
+    index = month.year * 12 + month.month - 1 + delta
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_exams(classroom_id, month):
+    """Exams of one classroom whose date falls inside ``month``."""
+    return Exams.objects.filter(
+        classroom_id=classroom_id,
+        date__gte=month,
+        date__lt=shift_month(month, 1),
+    )
+
+
+def month_state(classroom_id, month):
+    """``(count, last_modified)`` of a month window, for conditional GETs."""
+    state = month_exams(classroom_id, month).aggregate(
+        count=Count('id'), last_modified=Max('updated_at'))
+    return state['count'], state['last_modified']
+
+
+def month_etag(classroom_id, month, count, last_modified):
+    stamp = last_modified.isoformat() if last_modified else ''
+    raw = f"{classroom_id}:{month:%Y-%m}:{count}:{stamp}"
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def month_payload(classroom_id, month):
+    exams = (
+        month_exams(classroom_id, month)
+        .select_related('subject', 'teacher__user')
+        .order_by('date', 'id')
+    )
+
+    return {
+        'month': f"{month:%Y-%m}",
+        'previous': f"{shift_month(month, -1):%Y-%m}",
+        'next': f"{shift_month(month, 1):%Y-%m}",
+        'exams': [
+            {'id': e.id,
+             'type': e.type,
+             'date': e.date.isoformat(),
+             'teacher': f"{e.teacher.user.first_name} {e.teacher.user.last_name}",
+             'subject': e.subject.name} for e in exams
+        ],
+    }
+
+
+def get_month_state(classroom_id, month):
+    """Cached ``month_state``; rebuilt when an exam of the classroom changes."""
+    return caching.get_or_build(
+        f"calendar-state:{classroom_id}:{month:%Y-%m}",
+        [('exams', classroom_id)],
+        lambda: month_state(classroom_id, month))
+
+
+def get_month_payload(classroom_id, month):
+    return caching.get_or_build(
+        f"calendar:{classroom_id}:{month:%Y-%m}",
+        [('exams', classroom_id)],
+        lambda: month_payload(classroom_id, month))
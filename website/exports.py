@@ -0,0 +1,232 @@
+"""Streaming CSV and XLSX exports of the grade catalog and the absence log.
+
+Rows are read with ``iterator(chunk_size=...)`` and written to the client
+as they arrive, so memory use stays flat whatever the size of the export,
+up to a whole school's history.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from .models import Absence, Grade
+
+
+CHUNK_SIZE = 2000
+
+# rows written between two chunks sent to the client
+ROWS_PER_CHUNK = 500
+
+STUDENT_COLUMNS = ['Scoala', 'Clasa', 'Nume', 'Prenume', 'Initiala tatalui']
+
+
+# ===== ROWS =====
+
+def _ordered(queryset, *fields):
+    # School, classroom and student first, like the catalog on paper.
+    return queryset.order_by(
+        'student__classroom__school__name',
+        'student__classroom__number',
+        'student__classroom__letter',
+        'student__user__last_name',
+        'student__user__first_name',
+        'student_id',
+        *fields,
+    )
+
+
+def grade_rows(grades):
+    rows = _ordered(grades, 'subject__name', 'date', 'id').values_list(
+        'student__classroom__school__name',
+        'student__classroom__number',
+        'student__classroom__letter',
+        'student__user__last_name',
+        'student__user__first_name',
+        'student__fathers_initial',
+        'subject__name',
+        'date',
+        'grade',
+        'evaluation_type',
+    )
+    for (school, number, letter, last_name, first_name, initial, subject,
+         day, grade, evaluation_type) in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [school, f"{number}{letter}", last_name, first_name, initial,
+               subject or '', day, grade, evaluation_type]
+
+
+def absence_rows(absences):
+    rows = _ordered(absences, 'date', 'time', 'id').values_list(
+        'student__classroom__school__name',
+        'student__classroom__number',
+        'student__classroom__letter',
+        'student__user__last_name',
+        'student__user__first_name',
+        'student__fathers_initial',
+        'subject__name',
+        'date',
+        'time',
+        'recorded_by__user__first_name',
+        'recorded_by__user__last_name',
+        'note',
+    )
+    for (school, number, letter, last_name, first_name, initial, subject,
+         day, time, teacher_first, teacher_last,
+         note) in rows.iterator(chunk_size=CHUNK_SIZE):
+        recorded_by = f"{teacher_first} {teacher_last}" if teacher_first else ''
+        yield [school, f"{number}{letter}", last_name, first_name, initial,
+               subject or '', day, time.strftime('%H:%M'), recorded_by, note]
+
+
+# kind: (title, header, model, rows)
+KINDS = {
+    'grades': ('catalog', STUDENT_COLUMNS + [
+        'Materie', 'Data', 'Nota', 'Tip evaluare'], Grade, grade_rows),
+    'absences': ('absente', STUDENT_COLUMNS + [
+        'Materie', 'Data', 'Ora', 'Profesor', 'Nota'], Absence, absence_rows),
+}
+
+
+# ===== CSV =====
+
+def csv_stream(title, header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM, so spreadsheet programs read the diacritics as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(header)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+# ===== XLSX =====
+
+class _Pipe:
+    """Write-only file that hands out what was written so far.
+
+    zipfile falls back to data descriptors when the file cannot seek, so an
+    archive can be streamed while it is being written.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+# characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_FILES = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+
+def _cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values):
+    return '<row>' + ''.join(_cell(value) for value in values) + '</row>'
+
+
+def xlsx_stream(title, header, rows):
+    """A single-sheet workbook, written (and compressed) row by row."""
+    pipe = _Pipe()
+
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_FILES.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', WORKBOOK.format(
+            name=escape(title[:31])))
+        yield pipe.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w',
+                          force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/'
+                b'spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_row(header).encode())
+
+            for count, row in enumerate(rows, 1):
+                sheet.write(_row(row).encode())
+                if count % ROWS_PER_CHUNK == 0:
+                    yield pipe.drain()
+
+            sheet.write(b'</sheetData></worksheet>')
+
+    yield pipe.drain()
+
+
+# format: (writer, content type)
+FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument'
+                          '.spreadsheetml.sheet'),
+}
+
+
+def export_response(kind, fmt, filename, **filters):
+    """Stream the ``kind`` rows matching ``filters`` as a ``fmt`` download."""
+    title, header, model, rows = KINDS[kind]
+    writer, content_type = FORMATS[fmt]
+
+    content = writer(title, header, rows(model.objects.filter(**filters)))
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{title}-{filename}-{date.today()}.{fmt}"')
+    return response
@@ -0,0 +1,364 @@
+"""Bulk CSV import of students, timetables and grades into one school.
+
+Files are read in chunks of ``CHUNK_SIZE`` rows; every chunk is validated,
+its lookups are done with one query per related model and its rows are
+written with bulk_create. A whole file is one transaction: if any row is
+invalid (or on a dry run) nothing is saved, and the report lists every
+problem with its line number.
+
+Columns (first line of the file; extra columns are ignored):
+    students   username, first_name, last_name, classroom
+               [email, password, fathers_initial, phone]
+    timetable  classroom, day, start_time, subject, teacher
+    grades     username, subject, date, grade [evaluation_type]
+"""
+import csv
+import os
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import caching, tasks, weekly_stats
+from .models import (Classroom, Grade, ScheduleEntry, StudentProfile, Subject,
+                     TeacherProfile)
+from .timetable import DAYS, weekday_number
+
+
+CHUNK_SIZE = 1000
+
+# how many errors the report spells out
+MAX_REPORTED_ERRORS = 50
+
+CLASSROOM_NAME = re.compile(r'^(\d{1,2})\s*([A-Za-z])$')
+
+
+class RowError(Exception):
+    pass
+
+
+class ImportReport:
+    def __init__(self, kind, dry_run=False):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.notes = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def saved(self):
+        return self.ok and not self.dry_run
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def lines(self):
+        if self.saved:
+            status = f"{self.created} înregistrări create"
+        elif self.ok:
+            status = f"{self.created} înregistrări valide (simulare, nimic salvat)"
+        else:
+            status = f"{len(self.errors)} erori, nimic salvat"
+
+        lines = [f"Import {self.kind}: {self.rows} rânduri, {status}."]
+        lines += self.notes
+        lines += [f"Linia {line}: {message}"
+                  for line, message in self.errors[:MAX_REPORTED_ERRORS]]
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            lines.append(
+                f"... și încă {len(self.errors) - MAX_REPORTED_ERRORS} erori.")
+        return lines
+
+
+def hash_passwords(passwords):
+    """Hash a batch of passwords on a thread pool (blank = unusable).
+
+    The hashers spend their time in C code that releases the GIL, so the
+    batch runs on every core.
+    """
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(
+            lambda password: make_password(password or None), passwords))
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _field(row, name):
+    return (row.get(name) or '').strip()
+
+
+# ===== IMPORTERS =====
+
+class Importer(ABC):
+    columns = []
+
+    def __init__(self, school, report):
+        self.school = school
+        self.report = report
+        self.new_classrooms = []
+        self.classrooms = {
+            classroom.name.upper(): classroom
+            for classroom in Classroom.objects.filter(school=school)
+        }
+        self.subjects = {
+            subject.name.lower(): subject for subject in Subject.objects.all()
+        }
+
+    def classroom(self, name, create=False):
+        match = CLASSROOM_NAME.match(name)
+        if not match:
+            raise RowError(f"clasa '{name}' nu are forma 9A")
+
+        key = f"{match[1]}{match[2]}".upper()
+        if key not in self.classrooms:
+            if not create:
+                raise RowError(f"clasa {key} nu există în {self.school}")
+            self.classrooms[key] = Classroom.objects.create(
+                number=match[1], letter=match[2].upper(), school=self.school)
+            self.new_classrooms.append(key)
+        return self.classrooms[key]
+
+    def subject(self, name):
+        try:
+            return self.subjects[name.lower()]
+        except KeyError:
+            raise RowError(f"materia '{name}' nu există") from None
+
+    @abstractmethod
+    def import_chunk(self, rows):
+        """Validate and save a list of ``(line number, row)``."""
+
+    def finish(self):
+        pass
+
+
+class StudentImporter(Importer):
+    columns = ['username', 'first_name', 'last_name', 'classroom']
+
+    def __init__(self, school, report):
+        super().__init__(school, report)
+        self.seen = set()
+
+    def import_chunk(self, rows):
+        usernames = [_field(row, 'username') for line, row in rows]
+        taken = set(User.objects.filter(
+            username__in=usernames).values_list('username', flat=True))
+
+        valid = []
+        for line, row in rows:
+            username = _field(row, 'username')
+            try:
+                if not username:
+                    raise RowError("username lipsă")
+                if username in taken or username in self.seen:
+                    raise RowError(f"utilizatorul {username} există deja")
+                classroom = self.classroom(_field(row, 'classroom'), create=True)
+            except RowError as exc:
+                self.report.error(line, str(exc))
+                continue
+
+            self.seen.add(username)
+            valid.append((row, classroom))
+
+        passwords = hash_passwords(
+            [_field(row, 'password') for row, classroom in valid])
+
+        users = User.objects.bulk_create([
+            User(
+                username=_field(row, 'username'),
+                first_name=_field(row, 'first_name'),
+                last_name=_field(row, 'last_name'),
+                email=_field(row, 'email'),
+                password=password,
+            )
+            for (row, classroom), password in zip(valid, passwords)
+        ])
+        StudentProfile.objects.bulk_create([
+            StudentProfile(
+                user=user,
+                classroom=classroom,
+                fathers_initial=_field(row, 'fathers_initial'),
+                phone=_field(row, 'phone'),
+            )
+            for user, (row, classroom) in zip(users, valid)
+        ])
+        self.report.created += len(users)
+
+
+class TimetableImporter(Importer):
+    columns = ['classroom', 'day', 'start_time', 'subject', 'teacher']
+
+    def __init__(self, school, report):
+        super().__init__(school, report)
+        self.slots = set(
+            ScheduleEntry.objects
+            .filter(classroom__school=school)
+            .values_list('classroom_id', 'weekday', 'slot')
+        )
+        self.changed = set()
+
+    def import_chunk(self, rows):
+        usernames = {_field(row, 'teacher') for line, row in rows}
+        teachers = {
+            teacher.user.username: teacher
+            for teacher in TeacherProfile.objects
+            .filter(user__username__in=usernames).select_related('user')
+        }
+
+        entries = []
+        for line, row in rows:
+            try:
+                classroom = self.classroom(_field(row, 'classroom'))
+                weekday = weekday_number(_field(row, 'day'))
+                if weekday is None:
+                    raise RowError(
+                        f"ziua '{_field(row, 'day')}' nu este una din "
+                        f"{', '.join(DAYS)}")
+                try:
+                    start_time = datetime.strptime(
+                        _field(row, 'start_time'), '%H:%M').time()
+                except ValueError:
+                    raise RowError("ora trebuie să aibă forma HH:MM") from None
+                subject = self.subject(_field(row, 'subject'))
+                teacher = teachers.get(_field(row, 'teacher'))
+                if teacher is None:
+                    raise RowError(
+                        f"profesorul {_field(row, 'teacher')} nu există")
+
+                slot = (classroom.id, weekday,
+                        ScheduleEntry.slot_of(start_time))
+                if slot in self.slots:
+                    raise RowError(
+                        f"clasa {classroom} are deja o oră {DAYS[weekday]} "
+                        f"la {start_time:%H:%M}")
+            except RowError as exc:
+                self.report.error(line, str(exc))
+                continue
+
+            self.slots.add(slot)
+            self.changed.add(classroom.id)
+            entries.append(ScheduleEntry(
+                classroom=classroom, subject=subject, teacher=teacher,
+                weekday=weekday, start_time=start_time, slot=slot[2]))
+
+        ScheduleEntry.objects.bulk_create(entries)
+        self.report.created += len(entries)
+
+    def finish(self):
+        # bulk_create does not send post_save
+        for classroom_id in self.changed:
+            caching.schedule_changed(classroom_id)
+            weekly_stats.timetable_changed(classroom_id, date.today())
+
+
+class GradeImporter(Importer):
+    columns = ['username', 'subject', 'date', 'grade']
+
+    def __init__(self, school, report):
+        super().__init__(school, report)
+        self.changed = set()
+        self.added = []
+
+    def import_chunk(self, rows):
+        usernames = {_field(row, 'username') for line, row in rows}
+        students = dict(
+            StudentProfile.objects
+            .filter(user__username__in=usernames, classroom__school=self.school)
+            .values_list('user__username', 'id')
+        )
+
+        grades = []
+        for line, row in rows:
+            try:
+                student_id = students.get(_field(row, 'username'))
+                if student_id is None:
+                    raise RowError(
+                        f"elevul {_field(row, 'username')} nu este în "
+                        f"{self.school}")
+                subject = self.subject(_field(row, 'subject'))
+                try:
+                    day = datetime.strptime(
+                        _field(row, 'date'), '%Y-%m-%d').date()
+                except ValueError:
+                    raise RowError(
+                        "data trebuie să aibă forma AAAA-LL-ZZ") from None
+                try:
+                    value = int(_field(row, 'grade'))
+                except ValueError:
+                    value = 0
+                if not 1 <= value <= 10:
+                    raise RowError("nota trebuie să fie între 1 și 10")
+            except RowError as exc:
+                self.report.error(line, str(exc))
+                continue
+
+            self.changed.add(student_id)
+            self.added.append((student_id, day))
+            grades.append(Grade(
+                student_id=student_id,
+                subject=subject,
+                date=day,
+                grade=value,
+                evaluation_type=_field(row, 'evaluation_type') or 'Ascultare',
+            ))
+
+        Grade.objects.bulk_create(grades)
+        self.report.created += len(grades)
+
+    def finish(self):
+        # the aggregates are rebuilt by a job, as after add_grades_bulk
+        tasks.refresh_grades.enqueue(student_ids=sorted(self.changed))
+        # bulk_create does not send post_save
+        caching.grades_changed(self.changed)
+        weekly_stats.grades_changed(added=self.added)
+
+
+IMPORTERS = {
+    'students': StudentImporter,
+    'timetable': TimetableImporter,
+    'grades': GradeImporter,
+}
+
+
+def run_import(kind, file, school, dry_run=False):
+    """Import the CSV text stream ``file`` into ``school``; returns the report."""
+    report = ImportReport(kind, dry_run)
+    reader = csv.DictReader(file)
+
+    importer_class = IMPORTERS[kind]
+    missing = [column for column in importer_class.columns
+               if column not in (reader.fieldnames or [])]
+    if missing:
+        report.error(1, f"lipsesc coloanele {', '.join(missing)}")
+        return report
+
+    with transaction.atomic():
+        importer = importer_class(school, report)
+
+        # line 1 is the header
+        for chunk in _chunks(enumerate(reader, start=2), CHUNK_SIZE):
+            report.rows += len(chunk)
+            importer.import_chunk(chunk)
+
+        if report.saved:
+            importer.finish()
+            report.notes += [f"Clasa {key} a fost creată."
+                             for key in importer.new_classrooms]
+        else:
+            transaction.set_rollback(True)
+
+    return report
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from django.urls import path
+
+from website import benchmarks, seed, urls, views
+from website.decorators import ROLE_SESSION_KEY
+from website.models import StudentProfile
+
+
+# URLconf of the benchmark: the site plus both variants of each view.
+urlpatterns = urls.urlpatterns + [
+    path('bench/sync/dashboard', views.student_main),
+    path('bench/async/dashboard', views.student_main_async),
+    path('bench/sync/exams', views.student_calendar_exams),
+    path('bench/async/exams', views.student_calendar_exams_async),
+]
+
+VIEWS = ['dashboard', 'exams']
+
+
+class Command(BaseCommand):
+    help = ("Compare the WSGI path (sync views, a thread per client) with "
+            "the ASGI path (async views, one event loop) on the student "
+            "dashboard and exam feed, under concurrent clients.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=20,
+                            help="Requests per client.")
+        parser.add_argument('--wsgi-threads', type=int, default=8,
+                            help="Threads of the WSGI worker (clients "
+                                 "beyond that wait for a free thread).")
+        parser.add_argument('--db-latency', type=float, default=2.0,
+                            help="Milliseconds added to every query, to "
+                                 "stand in for the network round trip to "
+                                 "a remote database.")
+        parser.add_argument('--cold', action='store_true',
+                            help="Clear the cache before every request.")
+
+    def handle(self, *args, **options):
+        logging.getLogger('website.performance').setLevel(logging.WARNING)
+
+        latency = options['db_latency'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            # Outermost: the connection may open inside a request, under
+            # the middleware's execute_wrapper, which pops the last one.
+            connection.execute_wrappers.insert(0, slow_query)
+
+        setup_test_environment()
+        try:
+            with benchmarks.scratch_database(), \
+                    override_settings(ROOT_URLCONF=__name__):
+                seed.generate(schools=1, classrooms=4, students=25, weeks=8)
+                cookies = self.log_in(options['clients'])
+
+                if latency:
+                    connection_created.connect(add_latency)
+                try:
+                    rows = []
+                    for view in VIEWS:
+                        for mode in ('wsgi', 'asgi'):
+                            connections.close_all()
+                            samples, elapsed = self.run(
+                                mode, view, cookies, options)
+                            rows.append((view, mode, samples, elapsed))
+                finally:
+                    connection_created.disconnect(add_latency)
+                    connections.close_all()
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{options['clients']} clients x {options['requests']} requests, "
+            f"{options['db_latency']} ms per query, "
+            f"{options['wsgi_threads']} WSGI threads")
+        self.stdout.write(
+            f"{'view':<10} {'path':<6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        for view, mode, samples, elapsed in rows:
+            self.stdout.write(
+                f"{view:<10} {mode:<6} {len(samples) / elapsed:>8.0f} "
+                f"{benchmarks.percentile(samples, 50):>9.2f} "
+                f"{benchmarks.percentile(samples, 95):>9.2f}")
+
+    def log_in(self, count):
+        """Session cookies of ``count`` students, with their role cached."""
+        students = list(
+            StudentProfile.objects.filter(classroom__isnull=False)
+            .select_related('user').order_by('id')[:count])
+
+        cookies = []
+        for n in range(count):
+            client = Client()
+            client.force_login(students[n % len(students)].user)
+            session = client.session
+            session[ROLE_SESSION_KEY] = 'student'
+            session.save()
+            cookies.append(client.cookies)
+        return cookies
+
+    def run(self, mode, view, cookies, options):
+        url = f"/bench/{'async' if mode == 'asgi' else 'sync'}/{view}"
+        requests, cold = options['requests'], options['cold']
+
+        def client_loop(jar):
+            client = Client()
+            client.cookies = jar
+            samples = []
+            for _ in range(requests):
+                if cold:
+                    cache.clear()
+                started = time.perf_counter()
+                client.get(url)
+                samples.append((time.perf_counter() - started) * 1000)
+            connections.close_all()
+            return samples
+
+        async def async_client_loop(jar):
+            client = AsyncClient()
+            client.cookies = jar
+            samples = []
+            for _ in range(requests):
+                if cold:
+                    cache.clear()
+                started = time.perf_counter()
+                # ASGIHandler gives every request its own thread for sync
+                # code; the test handler does not, so do it here.
+                async with ThreadSensitiveContext():
+                    await client.get(url)
+                samples.append((time.perf_counter() - started) * 1000)
+            return samples
+
+        async def run_async():
+            return await asyncio.gather(
+                *(async_client_loop(jar) for jar in cookies))
+
+        started = time.perf_counter()
+        if mode == 'wsgi':
+            threads = min(len(cookies), options['wsgi_threads'])
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = list(executor.map(client_loop, cookies))
+        else:
+            results = asyncio.run(run_async())
+        elapsed = time.perf_counter() - started
+
+        return [sample for samples in results for sample in samples], elapsed
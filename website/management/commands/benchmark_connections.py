@@ -0,0 +1,144 @@
+import importlib.util
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from website import benchmarks, seed
+from website.decorators import ROLE_SESSION_KEY
+from website.models import StudentProfile
+
+
+# connection settings compared by the benchmark, applied on top of the
+# configured database
+MODES = {
+    'fresh': {'CONN_MAX_AGE': 0, 'pool': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'pool': False},
+    'pool': {'CONN_MAX_AGE': 0, 'pool': True},
+}
+
+
+def configure(mode, pool_size):
+    """Switch the default database to ``mode`` for connections opened next.
+
+    Every DatabaseWrapper shares the settings dict, so changing it here
+    applies to the worker threads' connections too.
+    """
+    close_connections()
+    settings = connections.settings['default']
+    settings['CONN_MAX_AGE'] = MODES[mode]['CONN_MAX_AGE']
+    settings['OPTIONS'].pop('pool', None)
+    if MODES[mode]['pool']:
+        settings['OPTIONS']['pool'] = {
+            'min_size': pool_size, 'max_size': pool_size, 'timeout': 30}
+
+
+def close_connections():
+    if hasattr(connection, 'close_pool'):
+        connection.close_pool()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ("Compare per-request connections, persistent connections "
+            "(CONN_MAX_AGE) and the psycopg pool under concurrent requests. "
+            "Run it against PostgreSQL, e.g. the docker-compose.yml service.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16,
+                            help="Concurrent clients.")
+        parser.add_argument('--requests', type=int, default=50,
+                            help="Requests per client.")
+        parser.add_argument('--pool-size', type=int, default=8)
+        parser.add_argument('--mode', action='append', choices=MODES,
+                            dest='modes',
+                            help="Mode to measure (repeatable, default all).")
+
+    def handle(self, *args, **options):
+        logging.getLogger('website.performance').setLevel(logging.WARNING)
+
+        modes = options['modes'] or list(MODES)
+        if 'pool' in modes and (
+                connection.vendor != 'postgresql'
+                or importlib.util.find_spec('psycopg_pool') is None):
+            self.stderr.write(
+                "pool needs PostgreSQL and psycopg[pool]; skipping it.")
+            modes.remove('pool')
+        if not modes:
+            raise CommandError("Nothing to measure.")
+
+        settings = connections.settings['default']
+        original = (settings['CONN_MAX_AGE'], settings['OPTIONS'].get('pool'))
+
+        setup_test_environment()
+        try:
+            with benchmarks.scratch_database():
+                seed.generate(schools=1, classrooms=2, students=25, weeks=4)
+                rows = [
+                    (mode, *self.run_mode(mode, options))
+                    for mode in modes
+                ]
+                # leave the scratch database with the connection it opened
+                configure('fresh', options['pool_size'])
+        finally:
+            settings['CONN_MAX_AGE'] = original[0]
+            if original[1] is not None:
+                settings['OPTIONS']['pool'] = original[1]
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{options['threads']} clients x {options['requests']} requests, "
+            f"health checks {'on' if settings['CONN_HEALTH_CHECKS'] else 'off'}")
+        self.stdout.write(
+            f"{'mode':<12} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for mode, samples, elapsed in rows:
+            self.stdout.write(
+                f"{mode:<12} {len(samples) / elapsed:>8.0f} "
+                f"{benchmarks.percentile(samples, 50):>9.2f} "
+                f"{benchmarks.percentile(samples, 95):>9.2f} "
+                f"{benchmarks.percentile(samples, 99):>9.2f}")
+
+    def run_mode(self, mode, options):
+        configure(mode, options['pool_size'])
+
+        students = list(
+            StudentProfile.objects.select_related('user')
+            .order_by('id')[:options['threads']])
+        url = reverse('student-table')
+
+        def client_loop(student):
+            client = Client()
+            client.force_login(student.user)
+            session = client.session
+            session[ROLE_SESSION_KEY] = 'student'
+            session.save()
+            client.get(url)  # warm the timetable cache
+
+            samples = []
+            for _ in range(options['requests']):
+                # The test client skips the request_started/finished
+                # handlers that recycle connections; run them as the WSGI
+                # handler would, inside the timed window.
+                started = time.perf_counter()
+                close_old_connections()
+                client.get(url)
+                close_old_connections()
+                samples.append((time.perf_counter() - started) * 1000)
+
+            connections.close_all()
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            results = list(executor.map(
+                client_loop,
+                [students[n % len(students)]
+                 for n in range(options['threads'])]))
+        elapsed = time.perf_counter() - started
+
+        return [sample for samples in results for sample in samples], elapsed
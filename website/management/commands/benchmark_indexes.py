@@ -0,0 +1,117 @@
+from datetime import time, timedelta
+
+from django.core.management.base import BaseCommand
+
+from website import benchmarks, seed
+from website.models import (Absence, Exams, Grade, ScheduleEntry,
+                            StudentProfile)
+
+
+# Indexes and constraints added for the hot lookup paths (migrations 0006
+# and 0007). They are dropped for the "without" run.
+HOT_PATH_INDEXES = [
+    (ScheduleEntry, 'unique_schedule_slot'),
+    (Exams, 'exam_classroom_date'),
+    (Grade, 'grade_student_date'),
+    (Absence, 'unique_absence_per_lesson'),
+]
+
+
+def hot_queries(student, today):
+    """The lookups the views run, keyed by a short description."""
+    classroom = student.classroom_id
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    month_start = today.replace(day=1)
+
+    return {
+        "schedule: today's classes": ScheduleEntry.objects.filter(
+            classroom=classroom, weekday=0).order_by('slot'),
+        "schedule: roll-call slot": ScheduleEntry.objects.filter(
+            classroom=classroom, weekday=0,
+            start_time=time(seed.LESSON_HOURS[0])),
+        "exams: calendar month": Exams.objects.filter(
+            classroom=classroom, date__gte=month_start,
+            date__lt=month_start + timedelta(days=31)),
+        "exams: this week": Exams.objects.filter(
+            classroom=classroom, date__gte=week_start, date__lte=week_end),
+        "absences: this week": Absence.objects.filter(
+            student=student, date__gte=week_start, date__lte=week_end),
+        "grades: this week": Grade.objects.filter(
+            student=student, date__gte=week_start, date__lte=week_end),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Seed a multi-school dataset in a scratch database and compare "
+            "EXPLAIN plans and timings of the hot lookups with and without "
+            "the hot-path indexes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, default=4)
+        parser.add_argument('--classrooms', type=int, default=8)
+        parser.add_argument('--students', type=int, default=28)
+        parser.add_argument('--weeks', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=50,
+                            help="Executions per query and phase.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmarks.scratch_database() as connection:
+            counts = seed.generate(
+                schools=options['schools'],
+                classrooms=options['classrooms'],
+                students=options['students'],
+                weeks=options['weeks'],
+                seed=options['seed'],
+            )
+            self.stdout.write(
+                f"Database: {connection.vendor}; seeded "
+                + ", ".join(f"{n} {name}" for name, n in counts.items()))
+
+            student = StudentProfile.objects.order_by('id').last()
+            today = Grade.objects.latest('date').date
+
+            benchmarks.analyze()
+            after = self.measure(student, today, options['repeat'])
+
+            with connection.schema_editor() as editor:
+                for model, name in HOT_PATH_INDEXES:
+                    self.drop(editor, model, name)
+            benchmarks.analyze()
+            before = self.measure(student, today, options['repeat'])
+
+        for name in after:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            for label, results in (("without indexes", before),
+                                   ("with indexes", after)):
+                plan, samples = results[name]
+                self.stdout.write(
+                    f"  {label}: median {benchmarks.percentile(samples, 50):.3f} ms, "
+                    f"p95 {benchmarks.percentile(samples, 95):.3f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"      {line}")
+
+    def measure(self, student, today, repeat):
+        results = {}
+        for name, queryset in hot_queries(student, today).items():
+            plan = queryset.explain()
+            samples = benchmarks.timed(lambda: list(queryset.all()), repeat)
+            results[name] = (plan, samples)
+        return results
+
+    def drop(self, editor, model, name):
+        for index in model._meta.indexes:
+            if index.name == name:
+                return editor.remove_index(model, index)
+        for constraint in model._meta.constraints:
+            if constraint.name == name:
+                # SQLite drops constraints by rebuilding the table from
+                # _meta, so the constraint must be gone from it first.
+                original = model._meta.constraints
+                model._meta.constraints = [
+                    c for c in original if c is not constraint]
+                try:
+                    return editor.remove_constraint(model, constraint)
+                finally:
+                    model._meta.constraints = original
@@ -0,0 +1,117 @@
+import logging
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from website import benchmarks, seed
+from website.models import StudentProfile
+
+
+def view_urls(student, teacher):
+    """The read-heavy views, as (name, url, user to log in as)."""
+    return [
+        ('student_main', reverse('student-page'), student.user),
+        ('student_grades', reverse('student-grades'), student.user),
+        ('student_time_table', reverse('student-table'), student.user),
+        ('student_calendar', reverse('student-calendar-exams'), student.user),
+        ('student_attendance', reverse('student-attendance'), student.user),
+        ('teacher_classroom_detail',
+         reverse('teacher-classroom', args=[student.classroom_id]),
+         teacher.user),
+    ]
+
+
+class Command(BaseCommand):
+    help = ("Seed a scratch database and drive the main views through the "
+            "test client, reporting queries, p50/p95 latency and peak "
+            "memory per view.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, default=2)
+        parser.add_argument('--classrooms', type=int, default=8)
+        parser.add_argument('--students', type=int, default=28)
+        parser.add_argument('--years', type=float, default=1)
+        parser.add_argument('--requests', type=int, default=30,
+                            help="Requests per view.")
+        parser.add_argument('--cold', action='store_true',
+                            help="Clear the cache before every request.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        # keep the per-request log lines out of the report, but not the
+        # query budget warnings
+        logging.getLogger('website.performance').setLevel(logging.WARNING)
+
+        setup_test_environment()
+        try:
+            with benchmarks.scratch_database():
+                seed.generate(
+                    schools=options['schools'],
+                    classrooms=options['classrooms'],
+                    students=options['students'],
+                    weeks=max(1, round(options['years'] * 52)),
+                    seed=options['seed'],
+                )
+                benchmarks.analyze()
+                rows = self.run_views(options['requests'], options['cold'])
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'view':<26} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9} {'peak KiB':>9}")
+        for name, queries, samples, peak in rows:
+            self.stdout.write(
+                f"{name:<26} {queries:>8} "
+                f"{benchmarks.percentile(samples, 50):>9.2f} "
+                f"{benchmarks.percentile(samples, 95):>9.2f} "
+                f"{peak / 1024:>9.0f}")
+
+    def run_views(self, requests, cold):
+        student = (
+            StudentProfile.objects
+            .filter(classroom__isnull=False)
+            .select_related('user', 'classroom__form_teacher__user')
+            .order_by('id')
+            .first()
+        )
+        teacher = student.classroom.scheduleentry_set.select_related(
+            'teacher__user').first().teacher
+
+        rows = []
+        client = Client()
+
+        for name, url, user in view_urls(student, teacher):
+            client.force_login(user)
+
+            response = client.get(url)  # warm-up
+            if response.status_code != 200:
+                self.stderr.write(f"{name}: HTTP {response.status_code}")
+
+            # the query log is capped, so empty it before counting
+            if cold:
+                cache.clear()
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+
+            def request():
+                if cold:
+                    cache.clear()
+                client.get(url)
+
+            samples = benchmarks.timed(request, requests)
+
+            tracemalloc.start()
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            rows.append((name, len(queries), samples, peak))
+
+        return rows
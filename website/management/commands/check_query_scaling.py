@@ -0,0 +1,228 @@
+import logging
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import URLPattern, reverse
+
+from website import benchmarks, seed, urls
+from website.decorators import ROLE_SESSION_KEY
+from website.models import Classroom, Exams
+
+
+# (students per class, weeks of history): the class grows 10x and every
+# student's grade/absence history doubles at each step.
+SIZES = [(10, 2), (100, 4), (1000, 8)]
+
+# A branch taken for one dataset and not another (get_or_create) may move
+# the count by this many queries; a wider spread means it depends on the data.
+TOLERANCE = 2
+
+# Routes that are only meaningful as a POST, with the form they submit.
+POST_DATA = {
+    'login': lambda f: {'username': f['student'].user.username,
+                        'password': 'wrong'},
+    'add-grade': lambda f: {'student': f['student'].id,
+                            'subject': f['entry'].subject_id, 'grade': 9,
+                            'date': f['lesson_date'].isoformat()},
+    'add-grades-bulk': lambda f: {
+        'exam': f['exam'].id,
+        **{f"grade_{s.id}": 8 for s in f['students']}},
+    'add-absence': lambda f: {'student': f['student'].id,
+                              'subject': f['entry'].subject_id,
+                              'date': f['lesson_date'].isoformat(),
+                              'time': '12:30'},
+    'add-absences-rollcall': lambda f: {
+        'date': f['lesson_date'].isoformat(),
+        'time': f['entry'].start_time.strftime('%H:%M'),
+        'absent': [s.id for s in f['students']]},
+    'add-exam': lambda f: {'type': 'Test',
+                           'subject': f['entry'].subject_id,
+                           'date': f['lesson_date'].isoformat()},
+}
+
+# Parameters of the URL patterns, filled from the fixture.
+URL_KWARGS = {
+    'class_id': lambda f: f['classroom'].id,
+    'exam_id': lambda f: f['exam'].id,
+    'school_id': lambda f: f['classroom'].school_id,
+    'kind': lambda f: 'grades',
+}
+
+
+def routes():
+    """Every named route of website/urls.py except the admin site."""
+    for pattern in urls.urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+def fixture(prefix, students, weeks, end):
+    seed.generate(schools=1, classrooms=1, students=students, weeks=weeks,
+                  prefix=prefix, end=end)
+    classroom = Classroom.objects.filter(
+        school__name__startswith=f"{prefix} ").get()
+    class_students = list(
+        classroom.studentprofile_set.select_related('user').order_by('id'))
+    entry = classroom.scheduleentry_set.select_related(
+        'teacher__user').order_by('id').first()
+
+    # first day after the seeded history on which ``entry`` takes place
+    weekday = entry.weekday
+    lesson_date = end + timedelta(days=(weekday - end.weekday()) % 7 or 7)
+
+    exam = Exams.objects.create(
+        type='Test', date=lesson_date, teacher=entry.teacher,
+        subject=entry.subject, classroom=classroom)
+    exam.file.save('subiect.pdf', ContentFile(b'%PDF-1.4\n'))
+
+    staff = User.objects.create_user(f"{prefix}-staff", is_staff=True)
+
+    return {
+        'staff': staff,
+        'classroom': classroom,
+        'students': class_students,
+        'student': class_students[0],
+        'teacher': entry.teacher,
+        'entry': entry,
+        'exam': exam,
+        'lesson_date': lesson_date,
+    }
+
+
+def statement_count(queries):
+    """Number of queries, counting a batched bulk_create as one.
+
+    Backends with a bound-parameter limit (SQLite) split a bulk_create into
+    several INSERTs of the same table; PostgreSQL sends a single one.
+    """
+    count, previous = 0, None
+    for query in queries:
+        sql = query['sql']
+        batch = sql.split('(', 1)[0] if sql.startswith('INSERT') else None
+        if batch is None or batch != previous:
+            count += 1
+        previous = batch
+    return count
+
+
+def login_role(pattern):
+    path = str(pattern.pattern)
+    if path.startswith(('student-page', 'exams')):
+        return 'student'
+    if path.startswith(('teacher', 'reviews')):
+        return 'teacher'
+    if path.startswith('school'):
+        return 'staff'
+    return None
+
+
+def login(client, role, f):
+    """Log in as the fixture's student or teacher, as login_user would."""
+    if role is None:
+        client.logout()
+        return
+
+    if role == 'staff':
+        client.force_login(f['staff'])
+        return
+
+    client.force_login(f[role].user)
+    session = client.session
+    session[ROLE_SESSION_KEY] = role
+    session.save()
+
+
+class Command(BaseCommand):
+    help = ("Seed classes of 10, 100 and 1,000 students and check that the "
+            "number of queries of every route in website/urls.py stays flat "
+            "as the data grows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report-only', action='store_true',
+                            help="Print the report without failing on growth.")
+
+    def handle(self, *args, **options):
+        logging.getLogger('website.performance').setLevel(logging.ERROR)
+
+        setup_test_environment()
+        try:
+            # the bulk forms post one field per student of the class;
+            # exam files go to a throwaway media directory
+            with benchmarks.scratch_database(), \
+                    tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=None,
+                                      MEDIA_ROOT=media_root):
+                curves, skipped = self.measure()
+        finally:
+            teardown_test_environment()
+
+        header = "".join(f"{f'{n} st.':>10}" for n, weeks in SIZES)
+        self.stdout.write(f"{'route':<26}{header}  growth")
+
+        growing = []
+        for name, counts in curves.items():
+            flat = max(counts) - min(counts) <= TOLERANCE
+            if not flat:
+                growing.append(name)
+            cells = "".join(f"{count:>10}" for count in counts)
+            verdict = (self.style.SUCCESS("flat") if flat
+                       else self.style.ERROR("VARIES"))
+            self.stdout.write(f"{name:<26}{cells}  {verdict}")
+
+        for name, reason in skipped.items():
+            self.stdout.write(f"{name:<26}  skipped: {reason}")
+
+        if growing and not options['report_only']:
+            raise CommandError(
+                "Query count varies with the data for: " + ", ".join(growing))
+
+    def measure(self, end=None):
+        end = end or date.today()
+        curves, skipped = {}, {}
+        client = Client()
+
+        for number, (students, weeks) in enumerate(SIZES):
+            f = fixture(f"scale{number}", students, weeks, end)
+
+            for pattern in routes():
+                try:
+                    kwargs = {key: URL_KWARGS[key](f)
+                              for key in pattern.pattern.converters}
+                except KeyError as exc:
+                    skipped[pattern.name] = f"no fixture for {exc.args[0]}"
+                    continue
+
+                url = reverse(pattern.name, kwargs=kwargs)
+                login(client, login_role(pattern), f)
+
+                # measure the uncached path, which is the one that scales
+                cache.clear()
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    if pattern.name in POST_DATA:
+                        response = client.post(
+                            url, POST_DATA[pattern.name](f))
+                    else:
+                        response = client.get(url)
+                    # exports query while they stream
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f"{pattern.name} answered {response.status_code} "
+                        f"with {students} students")
+
+                curves.setdefault(pattern.name, []).append(
+                    statement_count(queries.captured_queries))
+
+        return curves, skipped
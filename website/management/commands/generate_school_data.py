@@ -0,0 +1,51 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from website import seed
+
+
+class Command(BaseCommand):
+    help = ("Generate a deterministic synthetic school network: schools, "
+            "teachers, classrooms, students, full timetables and years of "
+            "grades, absences and exams.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, default=1)
+        parser.add_argument('--classrooms', type=int, default=8,
+                            help="Classrooms per school.")
+        parser.add_argument('--students', type=int, default=28,
+                            help="Students per classroom.")
+        parser.add_argument('--years', type=float, default=1,
+                            help="Years of history to generate.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--end', type=date.fromisoformat,
+                            help="Last day of history, YYYY-MM-DD (default: "
+                                 "today). Fix it to get identical datasets "
+                                 "on different days.")
+        parser.add_argument('--prefix', default='seed',
+                            help="Username prefix; use a new one to add a "
+                                 "second dataset to the same database.")
+        parser.add_argument('--password',
+                            help="Password for every generated user "
+                                 "(unusable if omitted).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        counts = seed.generate(
+            schools=options['schools'],
+            classrooms=options['classrooms'],
+            students=options['students'],
+            weeks=max(1, round(options['years'] * 52)),
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            end=options['end'],
+        )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            "Created " + ", ".join(f"{n} {name}" for name, n in counts.items())
+            + f" in {elapsed:.1f}s."))
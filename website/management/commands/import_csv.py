@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website import importers
+from website.models import School
+
+
+class Command(BaseCommand):
+    help = ("Import students, a timetable or grades into a school from a CSV "
+            "file. The whole file is one transaction: nothing is saved if "
+            "any row is invalid.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importers.IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--school', required=True,
+                            help="Id or name of the school.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate the file without saving anything.")
+
+    def handle(self, *args, **options):
+        school = self.get_school(options['school'])
+        started = time.perf_counter()
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            report = importers.run_import(
+                options['kind'], file, school, dry_run=options['dry_run'])
+
+        elapsed = time.perf_counter() - started
+        for line in report.lines():
+            self.stdout.write(line)
+
+        if not report.ok:
+            raise CommandError(f"Import failed with {len(report.errors)} errors.")
+        self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f}s."))
+
+    def get_school(self, value):
+        schools = School.objects.filter(name=value)
+        if value.isdigit():
+            schools = School.objects.filter(pk=value)
+        try:
+            return schools.get()
+        except School.DoesNotExist:
+            raise CommandError(f"School {value!r} does not exist.") from None
+        except School.MultipleObjectsReturned:
+            raise CommandError(
+                f"Several schools are named {value!r}; use the id.") from None
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from website import aggregates
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student and per-subject grade aggregates from the raw grades."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student', type=int, action='append', dest='students',
+            help="Only rebuild this student profile id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        count = aggregates.rebuild(options['students'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} grade aggregate rows."))
@@ -0,0 +1,38 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from website import weekly_stats
+from website.models import StudentProfile, WeeklyStats
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the WeeklyStats snapshot of every student for a week. "
+            "Schedule it at the start of each week (e.g. Monday 00:05); "
+            "signals keep the rows current in between.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--week', type=date.fromisoformat,
+                            help="Any day of the week, YYYY-MM-DD "
+                                 "(default: today).")
+        parser.add_argument('--keep-weeks', type=int, default=8,
+                            help="Delete snapshots older than this many "
+                                 "weeks (0 keeps everything).")
+
+    def handle(self, *args, **options):
+        start = weekly_stats.week_start(options['week'] or date.today())
+        started = time.perf_counter()
+
+        count = weekly_stats.refresh(StudentProfile.objects.all(), start)
+
+        deleted = 0
+        if options['keep_weeks']:
+            deleted, _ = WeeklyStats.objects.filter(
+                week_start__lt=start - timedelta(weeks=options['keep_weeks'])
+            ).delete()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {count} snapshots for the week of {start}, deleted "
+            f"{deleted} old ones in {elapsed:.1f}s."))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from website import tasks
+
+
+class Command(BaseCommand):
+    help = ("Run the background jobs queued by website.tasks. Start as many "
+            "workers as needed; they share the queue.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=10,
+                            help="Jobs claimed at a time.")
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit when the queue is empty.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                # a long-lived process, recycle the connection like a request
+                close_old_connections()
+                jobs = tasks.claim(options['batch'])
+
+                for job in jobs:
+                    started = time.perf_counter()
+                    ok = tasks.run(job)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    status = "done" if ok else f"failed (attempt {job.attempts})"
+                    self.stdout.write(
+                        f"{job.name} {job.kwargs} {status} in {elapsed:.0f} ms")
+
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
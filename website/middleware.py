@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('website.performance')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times every query."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """Statements run more than once (same SQL, any parameters).
+
+        These are the N+1 candidates; the fingerprint is a short hash of
+        the parametrised SQL.
+        """
+        return [
+            {
+                'fingerprint': hashlib.md5(
+                    sql.encode(), usedforsecurity=False).hexdigest()[:12],
+                'count': count,
+                'sql': sql[:200],
+            }
+            for sql, count in self.statements.most_common()
+            if count > 1
+        ]
+
+
+def query_budget(url_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+class QueryInstrumentationMiddleware:
+    """Per-request query count, SQL time and template time.
+
+    Each request is logged as one JSON line on the ``website.performance``
+    logger and summarised in a ``Server-Timing`` header. Requests above
+    their ``QUERY_BUDGETS`` entry log a warning, or raise
+    ``QueryBudgetExceeded`` when ``QUERY_BUDGET_STRICT`` is on (tests).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+
+        with self.recording(recorder):
+            response = self.get_response(request)
+
+        return self.process(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+
+        # Queries of sections run on their own worker threads (see
+        # dashboard.gather) use other connections and are not counted.
+        with self.recording(recorder):
+            response = await self.get_response(request)
+
+        return self.process(request, response, recorder, started)
+
+    @staticmethod
+    def recording(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def process(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        sql_ms = recorder.duration * 1000
+        template_ms = getattr(request, 'template_render_ms', 0)
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+
+        response['Server-Timing'] = ", ".join([
+            f'db;dur={sql_ms:.1f};desc="{recorder.count} queries"',
+            f'tpl;dur={template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        record = {
+            'url_name': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(sql_ms, 2),
+            'template_ms': round(template_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'response_bytes': (None if response.streaming
+                               else len(response.content)),
+            'duplicates': recorder.duplicates(),
+        }
+        logger.info(json.dumps(record))
+
+        budget = query_budget(url_name)
+        if budget is not None and recorder.count > budget:
+            message = (f"{url_name} ran {recorder.count} queries, "
+                       f"budget is {budget}")
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('minimum', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('maximum', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_aggregates', to='website.studentprofile')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='website.subject')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('subject__isnull', False)), fields=('student', 'subject'), name='unique_grade_aggregate_per_subject'), models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('student',), name='unique_grade_aggregate_overall')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0002_grade_aggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grade',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='website.studentprofile'),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='subject',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='website.subject'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['student', 'subject', 'date'], name='grade_student_subject_date'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_grade_links(apps, schema_editor):
+    Grade = apps.get_model('website', 'Grade')
+    StudentGrade = apps.get_model('website', 'StudentGrade')
+    SubjectGrade = apps.get_model('website', 'SubjectGrade')
+
+    Grade.objects.filter(student__isnull=True).update(student=Subquery(
+        StudentGrade.objects.filter(grade=OuterRef('pk')).values('student')[:1]
+    ))
+    Grade.objects.filter(subject__isnull=True).update(subject=Subquery(
+        SubjectGrade.objects.filter(grade=OuterRef('pk')).values('subject')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_grade_student_subject'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_grade_links, migrations.RunPython.noop),
+    ]
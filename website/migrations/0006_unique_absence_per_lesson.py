@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:43
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_absences(apps, schema_editor):
+    Absence = apps.get_model('website', 'Absence')
+    duplicates = (
+        Absence.objects
+        .values('student', 'date', 'time')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    groups = []
+    for row in duplicates:
+        ids = Absence.objects.filter(
+            student=row['student'], date=row['date'], time=row['time'],
+        ).order_by('id').values_list('id', flat=True)
+        groups.append("/".join(str(id) for id in ids))
+
+    if groups:
+        # nothing is deleted here (the rows may carry different notes):
+        # merge or remove them, then migrate
+        raise RuntimeError(
+            "Cannot add unique_absence_per_lesson, these Absence rows (by "
+            "id) are the same student, date and time: " + ", ".join(groups))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0005_exams_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_absences, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='absence',
+            constraint=models.UniqueConstraint(fields=('student', 'date', 'time'), name='unique_absence_per_lesson'),
+        ),
+    ]
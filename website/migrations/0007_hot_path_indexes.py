@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:44
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_schedule_entries(apps, schema_editor):
+    ScheduleEntry = apps.get_model('website', 'ScheduleEntry')
+    duplicates = (
+        ScheduleEntry.objects
+        .values('classroom', 'day_of_week', 'start_time')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    groups = []
+    for row in duplicates:
+        ids = ScheduleEntry.objects.filter(
+            classroom=row['classroom'],
+            day_of_week=row['day_of_week'],
+            start_time=row['start_time'],
+        ).order_by('id').values_list('id', flat=True)
+        groups.append("/".join(str(id) for id in ids))
+
+    if groups:
+        # nothing is deleted here: fix or remove these rows, then migrate
+        raise RuntimeError(
+            "Cannot add unique_schedule_slot, these ScheduleEntry rows (by "
+            "id) are the same classroom, day and start time: "
+            + ", ".join(groups))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0006_unique_absence_per_lesson'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exams',
+            index=models.Index(fields=['classroom', 'date'], name='exam_classroom_date'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['student', 'date'], name='grade_student_date'),
+        ),
+        migrations.RunPython(check_duplicate_schedule_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='scheduleentry',
+            constraint=models.UniqueConstraint(fields=('classroom', 'day_of_week', 'start_time'), name='unique_schedule_slot'),
+        ),
+    ]
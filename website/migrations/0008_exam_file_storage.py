@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:07
+
+import website.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exams',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=website.storage.exam_storage, upload_to='exam_files/'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('lessons', models.JSONField(default=list)),
+                ('exams', models.PositiveIntegerField(default=0)),
+                ('grades', models.PositiveIntegerField(default=0)),
+                ('absences', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_stats', to='website.studentprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Weekly stats',
+                'constraints': [models.UniqueConstraint(fields=('student', 'week_start'), name='unique_weekly_stats')],
+            },
+        ),
+    ]
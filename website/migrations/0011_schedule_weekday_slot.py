@@ -0,0 +1,82 @@
+from django.db import migrations, models
+
+
+# day_of_week was free text; both spellings were in use
+DAY_NAMES = {
+    name.lower(): weekday
+    for names in (["Luni", "Marti", "Miercuri", "Joi", "Vineri"],
+                  ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"])
+    for weekday, name in enumerate(names)
+}
+
+LESSON_MINUTES = 60
+
+
+def fill_weekday_and_slot(apps, schema_editor):
+    ScheduleEntry = apps.get_model('website', 'ScheduleEntry')
+
+    first = {}
+    unknown, duplicates, entries = [], [], []
+    for entry in ScheduleEntry.objects.order_by('id'):
+        weekday = DAY_NAMES.get(entry.day_of_week.strip().lower())
+        if weekday is None:
+            unknown.append(f"{entry.id} ({entry.day_of_week!r})")
+            continue
+
+        entry.weekday = weekday
+        entry.slot = (entry.start_time.hour * 60
+                      + entry.start_time.minute) // LESSON_MINUTES
+
+        # e.g. "Luni" and "Monday" rows of the same lesson
+        key = (entry.classroom_id, entry.weekday, entry.slot)
+        if key in first:
+            duplicates.append(f"{entry.id} (same slot as {first[key]})")
+            continue
+        first[key] = entry.id
+        entries.append(entry)
+
+    if unknown or duplicates:
+        # nothing is deleted here: fix or remove these rows, then migrate
+        problems = []
+        if unknown:
+            problems.append(
+                "unknown day of week: " + ", ".join(unknown))
+        if duplicates:
+            problems.append(
+                "lesson slot already taken in the classroom: "
+                + ", ".join(duplicates))
+        raise RuntimeError(
+            "Cannot convert these ScheduleEntry rows (by id), "
+            "day_of_week must be one of Luni..Vineri or Monday..Friday "
+            "and a classroom has one lesson per slot. "
+            + "; ".join(problems))
+
+    ScheduleEntry.objects.bulk_update(
+        entries, ['weekday', 'slot'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0010_weekly_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleentry',
+            name='weekday',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Luni'), (1, 'Marti'), (2, 'Miercuri'), (3, 'Joi'), (4, 'Vineri')], null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduleentry',
+            name='slot',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        # with a default, so the migration can be reversed
+        migrations.AlterField(
+            model_name='scheduleentry',
+            name='day_of_week',
+            field=models.CharField(default='', max_length=10),
+        ),
+        migrations.RunPython(fill_weekday_and_slot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def fill_day_of_week(apps, schema_editor):
+    ScheduleEntry = apps.get_model('website', 'ScheduleEntry')
+    names = ["Luni", "Marti", "Miercuri", "Joi", "Vineri"]
+
+    entries = list(ScheduleEntry.objects.all())
+    for entry in entries:
+        entry.day_of_week = names[entry.weekday]
+    ScheduleEntry.objects.bulk_update(entries, ['day_of_week'], batch_size=1000)
+
+
+# Separate from 0011: PostgreSQL cannot alter a table in the transaction
+# that just updated its rows when constraint checks are still pending.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0011_schedule_weekday_slot'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='scheduleentry',
+            name='unique_schedule_slot',
+        ),
+        # only runs backwards, before the old constraint is restored
+        migrations.RunPython(migrations.RunPython.noop, fill_day_of_week),
+        migrations.RemoveField(
+            model_name='scheduleentry',
+            name='day_of_week',
+        ),
+        migrations.AlterField(
+            model_name='scheduleentry',
+            name='weekday',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Luni'), (1, 'Marti'), (2, 'Miercuri'), (3, 'Joi'), (4, 'Vineri')]),
+        ),
+        migrations.AlterField(
+            model_name='scheduleentry',
+            name='slot',
+            field=models.PositiveSmallIntegerField(editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleentry',
+            constraint=models.UniqueConstraint(fields=('classroom', 'weekday', 'slot'), name='unique_schedule_slot'),
+        ),
+    ]
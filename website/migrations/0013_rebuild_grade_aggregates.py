@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum
+
+
+def rebuild_grade_aggregates(apps, schema_editor):
+    # what aggregates.rebuild() does, with the historical models: 0002
+    # created the table empty and it is read from Grade.student/subject,
+    # filled in by 0004
+    Grade = apps.get_model('website', 'Grade')
+    GradeAggregate = apps.get_model('website', 'GradeAggregate')
+
+    GradeAggregate.objects.all().delete()
+
+    grades = Grade.objects.filter(student__isnull=False)
+    rows = []
+    for subject_field, queryset in (
+        ('subject', grades.filter(subject__isnull=False)),
+        (None, grades),
+    ):
+        group_by = ['student'] + ([subject_field] if subject_field else [])
+        summaries = queryset.values(*group_by).annotate(
+            count=Count('id'),
+            total=Sum('grade'),
+            minimum=Min('grade'),
+            maximum=Max('grade'),
+            last_date=Max('date'),
+        ).order_by()
+        for row in summaries:
+            rows.append(GradeAggregate(
+                student_id=row.pop('student'),
+                subject_id=row.pop('subject', None),
+                **row
+            ))
+
+    GradeAggregate.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0012_schedule_weekday_slot_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_grade_aggregates,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0013_rebuild_grade_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['date'], name='absence_date'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['date'], name='grade_date'),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.forms import UserChangeForm
 from django.contrib.auth.admin import UserAdmin
 from django.contrib import admin
 
+from .storage import exam_storage
+
 
 class CustomUserChangeForm(UserChangeForm):
     class Meta:
@@ -104,6 +107,7 @@ class Exams(models.Model):
 
     file = models.FileField(
         upload_to="exam_files/",
+        storage=exam_storage,
         null=True,
         blank=True
     )
@@ -112,10 +116,30 @@ class Exams(models.Model):
         Classroom, on_delete=models.CASCADE, related_name="exams"
     )
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # upcoming exams, weekly stats and calendar month windows
+            models.Index(
+                fields=['classroom', 'date'],
+                name='exam_classroom_date',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.type} {self.subject.name} - {self.date}"
 
 
+class GradeQuerySet(models.QuerySet):
+    def for_student(self, student, subject=None):
+        """Grades of a student, read through the (student, subject, date) index."""
+        grades = self.filter(student=student)
+        if subject is not None:
+            grades = grades.filter(subject=subject)
+        return grades.order_by('subject', 'date')
+
+
 class Grade(models.Model):
     date = models.DateField()
     evaluation_type = models.CharField(max_length=30)
@@ -134,6 +158,41 @@ class Grade(models.Model):
         related_name='grades'
     )
 
+    # Direct links replacing the StudentGrade/SubjectGrade join tables.
+    # Nullable only so rows written through the legacy tables can be
+    # backfilled (see website.signals).
+    student = models.ForeignKey(
+        'StudentProfile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='grades'
+    )
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='grades'
+    )
+
+    objects = GradeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['student', 'subject', 'date'],
+                name='grade_student_subject_date',
+            ),
+            # "new grades this week" filters on student and a date range
+            models.Index(
+                fields=['student', 'date'],
+                name='grade_student_date',
+            ),
+            # the admin's date_hierarchy over every grade
+            models.Index(fields=['date'], name='grade_date'),
+        ]
+
     def __str__(self):
         return f"{self.grade}"
 
@@ -155,6 +214,18 @@ class StudentGrade(models.Model):
 
 
 class ScheduleEntry(models.Model):
+
+    # numbered like date.weekday()
+    WEEKDAYS = [
+        (0, "Luni"),
+        (1, "Marti"),
+        (2, "Miercuri"),
+        (3, "Joi"),
+        (4, "Vineri"),
+    ]
+
+    LESSON_MINUTES = 60
+
     classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     teacher = models.ForeignKey(
@@ -162,11 +233,44 @@ class ScheduleEntry(models.Model):
         on_delete=models.CASCADE,
         related_name="schedule",
     )
-    day_of_week = models.CharField(max_length=10)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS)
     start_time = models.TimeField()
+    # the lesson-long period of the day the lesson starts in (the hour, with
+    # 60 minute lessons); filled in from start_time
+    slot = models.PositiveSmallIntegerField(editable=False)
+
+    class Meta:
+        constraints = [
+            # one lesson per classroom slot; also the index behind every
+            # classroom/day lookup
+            models.UniqueConstraint(
+                fields=['classroom', 'weekday', 'slot'],
+                name='unique_schedule_slot',
+            ),
+        ]
+
+    @classmethod
+    def slot_of(cls, start_time):
+        return (start_time.hour * 60 + start_time.minute) // cls.LESSON_MINUTES
+
+    def clean(self):
+        if self.start_time is not None:
+            self.slot = self.slot_of(self.start_time)
+
+    def validate_constraints(self, exclude=None):
+        # slot is not a form field, but it follows start_time: check the
+        # slot constraint in forms too instead of failing on save
+        if exclude and 'start_time' not in exclude:
+            exclude = set(exclude) - {'slot'}
+        super().validate_constraints(exclude=exclude)
+
+    def save(self, *args, **kwargs):
+        # bulk_create skips save(): set slot there with slot_of
+        self.slot = self.slot_of(self.start_time)
+        super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.classroom.name} - {self.subject.name} ({self.day_of_week} {self.start_time})"
+        return f"{self.classroom.name} - {self.subject.name} ({self.get_weekday_display()} {self.start_time})"
 
 
 class Absence(models.Model):
@@ -196,7 +300,134 @@ class Absence(models.Model):
         ordering = ['-date', 'time']
         verbose_name = "Absence"
         verbose_name_plural = "Absences"
+        indexes = [
+            # the admin's date_hierarchy over every absence
+            models.Index(fields=['date'], name='absence_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'date', 'time'],
+                name='unique_absence_per_lesson',
+            ),
+        ]
 
     def __str__(self):
         subj = self.subject.name if self.subject else "—"
         return f"{self.student} — {subj} @ {self.date} {self.time}"
+
+
+class GradeAggregate(models.Model):
+    """Running totals of a student's grades, per subject and overall.
+
+    Rows with ``subject`` set summarise one student x subject pair; the row
+    with an empty ``subject`` summarises every grade of the student.
+    """
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='grade_aggregates'
+    )
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    minimum = models.PositiveSmallIntegerField(null=True, blank=True)
+    maximum = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'subject'],
+                condition=models.Q(subject__isnull=False),
+                name='unique_grade_aggregate_per_subject',
+            ),
+            models.UniqueConstraint(
+                fields=['student'],
+                condition=models.Q(subject__isnull=True),
+                name='unique_grade_aggregate_overall',
+            ),
+        ]
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else 0
+
+    def __str__(self):
+        subj = self.subject.name if self.subject else "overall"
+        return f"{self.student} — {subj}: {self.average:.2f}"
+
+
+class WeeklyStats(models.Model):
+    """A student's "This week" numbers, kept current by website.weekly_stats."""
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='weekly_stats'
+    )
+    week_start = models.DateField()
+    # [weekday, "HH:MM"] of every lesson of the classroom's timetable
+    lessons = models.JSONField(default=list)
+    exams = models.PositiveIntegerField(default=0)
+    grades = models.PositiveIntegerField(default=0)
+    absences = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Weekly stats"
+        constraints = [
+            # also the index of the dashboard's single read
+            models.UniqueConstraint(
+                fields=['student', 'week_start'],
+                name='unique_weekly_stats',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student} — {self.week_start}"
+
+
+class Job(models.Model):
+    """A unit of background work, see website.tasks."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict)
+    # hash of name and kwargs, for deduplication
+    key = models.CharField(max_length=40)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's "next due jobs" query
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at'),
+        ]
+        constraints = [
+            # an identical job that has not started yet is not queued twice
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
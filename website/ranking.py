@@ -0,0 +1,35 @@
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast, DenseRank
+
+from .models import GradeAggregate
+
+
+def classroom_ranking(classroom):
+    """Average grade and dense rank of every graded student in a classroom.
+
+    Reads the overall rows of the materialized grade aggregates and ranks
+    them in a single query; students without any grade are left out.
+    """
+    return (
+        GradeAggregate.objects
+        .filter(student__classroom=classroom, subject__isnull=True, count__gt=0)
+        .annotate(average=Cast('total', FloatField()) / F('count'))
+        .annotate(rank=Window(DenseRank(), order_by=F('average').desc()))
+        .values_list('student', 'average', 'rank')
+    )
+
+
+def student_rank(student):
+    """Return ``(rank, total_students)`` for the student within their class."""
+    if not student.classroom_id:
+        return 1, 1
+
+    ranking = list(classroom_ranking(student.classroom_id))
+
+    rank = 1
+    for student_id, average, position in ranking:
+        if student_id == student.id:
+            rank = position
+            break
+
+    return rank, len(ranking)
@@ -0,0 +1,171 @@
+"""Synthetic school data for benchmarks.
+
+Everything is derived from ``random.Random(seed)`` so the same arguments
+always produce the same dataset, and rows are written with bulk_create.
+"""
+import random
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import aggregates
+from .models import (Absence, Classroom, Exams, Grade, ScheduleEntry, School,
+                     StudentProfile, Subject, TeacherProfile)
+from .timetable import DAYS
+
+
+SUBJECTS = [
+    'Matematica', 'Romana', 'Engleza', 'Fizica', 'Chimie',
+    'Biologie', 'Istorie', 'Informatica', 'Educatie fizica',
+]
+FIRST_NAMES = ['Andrei', 'Maria', 'Ioana', 'Mihai', 'Elena', 'Alexandru',
+               'Ana', 'Stefan', 'Daria', 'Vlad', 'Sofia', 'Radu']
+LAST_NAMES = ['Popescu', 'Ionescu', 'Dumitru', 'Stan', 'Constantin',
+              'Georgescu', 'Marin', 'Tudor', 'Munteanu', 'Lazar']
+LETTERS = 'ABCDEFGH'
+LESSON_HOURS = [8, 9, 10, 11, 12, 13]
+SUMMER_HOLIDAY = (7, 8)
+
+BATCH_SIZE = 2000
+
+
+def _users(rng, prefix, count, password):
+    return [
+        User(
+            username=f"{prefix}{n}",
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=password,
+        )
+        for n in range(count)
+    ]
+
+
+@transaction.atomic
+def generate(schools=2, classrooms=4, students=25, weeks=12, seed=0,
+             prefix='seed', password=None, end=None):
+    """Create ``schools`` schools with a full timetable and ``weeks`` of history.
+
+    Each school gets one teacher per subject and ``classrooms`` classes of
+    ``students`` students. Exams, grades and absences are spread over the
+    lessons of the last ``weeks`` weeks up to ``end`` (today by default),
+    skipping the summer holiday. Usernames start with ``prefix``, so pick a
+    new one to add a second dataset to the same database. All seeded users
+    share one password hash (unusable unless ``password`` is given).
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    first_monday = end - timedelta(days=end.weekday(), weeks=weeks - 1)
+    password = make_password(password)
+
+    existing = {s.name: s for s in Subject.objects.filter(name__in=SUBJECTS)}
+    Subject.objects.bulk_create(
+        [Subject(name=name) for name in SUBJECTS if name not in existing])
+    subjects = list(Subject.objects.filter(name__in=SUBJECTS).order_by('id'))
+
+    counts = dict.fromkeys(
+        ['schools', 'classrooms', 'teachers', 'students', 'schedule',
+         'exams', 'grades', 'absences'], 0)
+
+    for school_no in range(schools):
+        school = School.objects.create(name=f"{prefix} school {school_no + 1}")
+        school_prefix = f"{prefix}-{school_no}-"
+
+        # ===== TEACHERS: one per subject =====
+        teacher_users = User.objects.bulk_create(
+            _users(rng, f"{school_prefix}t", len(subjects), password))
+        teachers = TeacherProfile.objects.bulk_create(
+            [TeacherProfile(user=user) for user in teacher_users])
+        TeacherProfile.subjects.through.objects.bulk_create([
+            TeacherProfile.subjects.through(
+                teacherprofile_id=teacher.id, subject_id=subject.id)
+            for teacher, subject in zip(teachers, subjects)
+        ])
+        teacher_for = {subject.id: teacher
+                       for teacher, subject in zip(teachers, subjects)}
+
+        # ===== CLASSROOMS AND STUDENTS =====
+        rooms = Classroom.objects.bulk_create([
+            Classroom(
+                number=str(9 + n // len(LETTERS) % 4),
+                letter=LETTERS[n % len(LETTERS)],
+                school=school,
+                form_teacher=rng.choice(teachers),
+            )
+            for n in range(classrooms)
+        ])
+
+        student_users = User.objects.bulk_create(
+            _users(rng, f"{school_prefix}s", classrooms * students, password),
+            batch_size=BATCH_SIZE)
+        profiles = StudentProfile.objects.bulk_create([
+            StudentProfile(user=user, classroom=rooms[n // students],
+                           fathers_initial=rng.choice('ABCDEGIMP') + '.')
+            for n, user in enumerate(student_users)
+        ], batch_size=BATCH_SIZE)
+        class_students = [profiles[n * students:(n + 1) * students]
+                          for n in range(classrooms)]
+
+        schedule, exams, grades, absences = [], [], [], []
+
+        for room, room_students in zip(rooms, class_students):
+            # ===== TIMETABLE: every weekday slot is filled =====
+            lessons = {}
+            for weekday in range(len(DAYS)):
+                for hour in LESSON_HOURS:
+                    subject = rng.choice(subjects)
+                    lessons[(weekday, hour)] = subject
+                    schedule.append(ScheduleEntry(
+                        classroom=room, subject=subject,
+                        teacher=teacher_for[subject.id],
+                        weekday=weekday, start_time=time(hour),
+                        slot=ScheduleEntry.slot_of(time(hour))))
+
+            # ===== EXAMS, GRADES AND ABSENCES, week by week =====
+            for week in range(weeks):
+                monday = first_monday + timedelta(weeks=week)
+
+                for (weekday, hour), subject in lessons.items():
+                    day = monday + timedelta(days=weekday)
+                    if day > end or day.month in SUMMER_HOLIDAY:
+                        continue
+
+                    if rng.random() < 0.05:
+                        exams.append(Exams(
+                            type=rng.choice(Exams.EXAM_TYPES)[0], date=day,
+                            teacher=teacher_for[subject.id],
+                            subject=subject, classroom=room))
+
+                    for student in room_students:
+                        roll = rng.random()
+                        if roll < 0.03:
+                            absences.append(Absence(
+                                student=student, subject=subject, date=day,
+                                time=time(hour),
+                                recorded_by=teacher_for[subject.id]))
+                        elif roll < 0.10:
+                            grades.append(Grade(
+                                student=student, subject=subject, date=day,
+                                grade=rng.randint(4, 10),
+                                evaluation_type='Ascultare'))
+
+        ScheduleEntry.objects.bulk_create(schedule, batch_size=BATCH_SIZE)
+        Exams.objects.bulk_create(exams, batch_size=BATCH_SIZE)
+        Grade.objects.bulk_create(grades, batch_size=BATCH_SIZE)
+        Absence.objects.bulk_create(absences, batch_size=BATCH_SIZE)
+
+        aggregates.rebuild(profile.id for profile in profiles)
+
+        counts['schools'] += 1
+        counts['classrooms'] += len(rooms)
+        counts['teachers'] += len(teachers)
+        counts['students'] += len(profiles)
+        counts['schedule'] += len(schedule)
+        counts['exams'] += len(exams)
+        counts['grades'] += len(grades)
+        counts['absences'] += len(absences)
+
+    return counts
@@ -1,4 +1,5 @@
 
+import os
 from pathlib import Path
 
 # Initialise environment variables
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'website.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,7 +39,7 @@ ROOT_URLCONF = 'website.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'website.templating.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -52,22 +54,91 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'website.wsgi.application'
+ASGI_APPLICATION = 'website.asgi.application'
 
 
 # Database
 
 
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+# Connection settings use the same variables as docker-compose.yml.
+# DB_CONN_MAX_AGE keeps a connection open between requests (seconds, 0 =
+# a new connection per request); DB_POOL=1 uses psycopg's connection pool
+# instead (needs psycopg[pool], and CONN_MAX_AGE must then be 0).
+# DB_CONN_HEALTH_CHECKS pings a reused connection before the first query of
+# a request, so a database restart does not surface as an error page.
+
+DB_POOL = _env_flag('DB_POOL', '0')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'hackathon_database',
-        'USER': 'nibble',
-        'PASSWORD': 'asfkjak24hasAsfs',
-        'HOST': '127.0.0.1',
-        'PORT': '5432'
+        'NAME': os.environ.get('POSTGRES_DB', 'hackathon_database'),
+        'USER': os.environ.get('POSTGRES_USER', 'nibble'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'asfkjak24hasAsfs'),
+        'HOST': os.environ.get('POSTGRES_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+            os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': _env_flag('DB_CONN_HEALTH_CHECKS', '1'),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '20')),
+        # seconds a request waits for a free connection before failing
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        # pooled connections are checked before they are handed out
+        'check': ConnectionPool.check_connection,
+    }
+
+
+# Route the student dashboard and exam feed to their async variants. Turn
+# on when serving website.asgi:application.
+
+ASYNC_VIEWS = _env_flag('ASYNC_VIEWS', '0')
+
+
+# Cache (website.caching)
+# CACHE_BACKEND selects file (default, shared by the processes of one
+# host), redis (shared by every host, use it when the site runs on more than
+# one) or locmem; CACHE_LOCATION is the directory or the redis:// URL. redis
+# needs the redis package. The cache holds the versions that invalidate the
+# cached pages, so every process that writes (web workers, run_worker,
+# import_csv and the other commands) must share it: locmem is only right
+# for a single process, such as runserver without a worker.
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'hermes'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             str(BASE_DIR / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache',
+              'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': 'hermes',
+    }
+}
+if CACHE_BACKEND != 'redis':
+    # Versioned keys leave old entries behind until they are culled.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
 
 # Password validation
 
@@ -108,3 +179,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Exam files are downloaded through an access-checked view
+# (website.storage.serve). Set SENDFILE_HEADER to let the web server send
+# them: 'X-Sendfile' (Apache mod_xsendfile, lighttpd) or 'X-Accel-Redirect'
+# (nginx, with an internal location mapping SENDFILE_URL to MEDIA_ROOT).
+SENDFILE_HEADER = os.environ.get('SENDFILE_HEADER', '')
+SENDFILE_URL = os.environ.get('SENDFILE_URL', '/protected-media/')
+
+
+# Background jobs (website.tasks). Eager mode (the default) runs them
+# in-process after each commit, which is enough for development. In
+# production set TASKS_EAGER=0 and keep `manage.py run_worker` running,
+# otherwise the queued jobs (aggregate rebuilds after bulk grading and
+# imports, e-mails) never run.
+TASKS_EAGER = _env_flag('TASKS_EAGER', '1')
+
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+DEFAULT_FROM_EMAIL = os.environ.get(
+    'DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+
+# Performance instrumentation (website.middleware)
+
+# Maximum queries per request, by URL name. Views without an entry use
+# QUERY_BUDGET_DEFAULT (None = unlimited).
+QUERY_BUDGETS = {
+    # worst case, measured by this middleware: a new session (role lookup),
+    # an empty cache and no WeeklyStats row yet for the week run 17 queries;
+    # later visits run about 5
+    'student-page': 17,
+    'student-grades': 7,
+    'student-table': 5,
+    'student-calendar': 5,
+    'student-calendar-exams': 6,
+    'student-attendance': 8,
+    'teacher-page': 5,
+    'teacher-classroom': 12,
+    'add-exam-page': 10,
+}
+QUERY_BUDGET_DEFAULT = None
+
+# Raise instead of logging a warning when a budget is exceeded.
+QUERY_BUDGET_STRICT = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'website.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,156 @@
+from datetime import date
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, tasks, weekly_stats
+from .models import (Absence, Exams, Grade, ScheduleEntry, StudentGrade,
+                     StudentProfile, SubjectGrade)
+
+
+# ===== LEGACY GRADE LINKS =====
+# Grades created through the old StudentGrade/SubjectGrade tables (admin,
+# scripts) still end up with the direct student/subject columns filled in.
+
+@receiver(post_save, sender=StudentGrade)
+def sync_grade_student(sender, instance, **kwargs):
+    Grade.objects.filter(pk=instance.grade_id).update(
+        student=instance.student_id)
+    caching.grades_changed([instance.student_id])
+    tasks.refresh_grades.enqueue(student_ids=[instance.student_id])
+
+
+@receiver(post_save, sender=SubjectGrade)
+def sync_grade_subject(sender, instance, **kwargs):
+    grades = Grade.objects.filter(pk=instance.grade_id)
+    grades.update(subject=instance.subject_id)
+    student_ids = [student_id for student_id
+                   in grades.values_list('student_id', flat=True) if student_id]
+    caching.grades_changed(student_ids)
+    if student_ids:
+        tasks.refresh_grades.enqueue(student_ids=student_ids)
+
+
+# ===== PREVIOUS VALUES =====
+# A row moved to another student, classroom or date also changes the data
+# of the old one, so the receivers below need the values before the save.
+
+TRACKED_FIELDS = {
+    Grade: ['student_id', 'date'],
+    Absence: ['student_id', 'date'],
+    Exams: ['classroom_id', 'date'],
+    ScheduleEntry: ['classroom_id'],
+    StudentProfile: ['classroom_id'],
+}
+
+
+@receiver(pre_save)
+def remember_previous(sender, instance, **kwargs):
+    fields = TRACKED_FIELDS.get(sender)
+    if fields is None:
+        return
+
+    values = None
+    if instance.pk is not None:
+        values = sender.objects.filter(
+            pk=instance.pk).values_list(*fields).first()
+    instance._previous = dict(zip(fields, values or [None] * len(fields)))
+
+
+def _previous(instance, field):
+    return getattr(instance, '_previous', {}).get(field)
+
+
+# ===== CACHE INVALIDATION (website.caching) =====
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def invalidate_grades(sender, instance, **kwargs):
+    caching.grades_changed(
+        [instance.student_id, _previous(instance, 'student_id')])
+
+
+@receiver(post_save, sender=Absence)
+@receiver(post_delete, sender=Absence)
+def invalidate_absences(sender, instance, **kwargs):
+    caching.absences_changed(
+        [instance.student_id, _previous(instance, 'student_id')])
+
+
+@receiver(post_save, sender=Exams)
+@receiver(post_delete, sender=Exams)
+def invalidate_exams(sender, instance, **kwargs):
+    previous = _previous(instance, 'classroom_id')
+    if previous is not None and previous != instance.classroom_id:
+        caching.exams_changed(previous)
+    caching.exams_changed(instance.classroom_id)
+
+
+@receiver(post_save, sender=ScheduleEntry)
+@receiver(post_delete, sender=ScheduleEntry)
+def invalidate_schedule(sender, instance, **kwargs):
+    previous = _previous(instance, 'classroom_id')
+    if previous is not None and previous != instance.classroom_id:
+        caching.schedule_changed(previous)
+    caching.schedule_changed(instance.classroom_id)
+
+
+# ===== WEEKLY STATS (website.weekly_stats) =====
+
+def _counted(instance, scope_field, created):
+    """``(added, removed)`` ``(scope id, date)`` pairs of a saved row."""
+    current = (getattr(instance, scope_field), instance.date)
+    previous = (_previous(instance, scope_field), _previous(instance, 'date'))
+    if created:
+        return [current], []
+    if previous == current or previous[0] is None:
+        return [], []
+    return [current], [previous]
+
+
+@receiver(post_save, sender=Grade)
+def count_grade(sender, instance, created, **kwargs):
+    weekly_stats.grades_changed(*_counted(instance, 'student_id', created))
+
+
+@receiver(post_delete, sender=Grade)
+def uncount_grade(sender, instance, **kwargs):
+    weekly_stats.grades_changed(removed=[(instance.student_id, instance.date)])
+
+
+@receiver(post_save, sender=Absence)
+def count_absence(sender, instance, created, **kwargs):
+    weekly_stats.absences_changed(*_counted(instance, 'student_id', created))
+
+
+@receiver(post_delete, sender=Absence)
+def uncount_absence(sender, instance, **kwargs):
+    weekly_stats.absences_changed(
+        removed=[(instance.student_id, instance.date)])
+
+
+@receiver(post_save, sender=Exams)
+def count_exam(sender, instance, created, **kwargs):
+    weekly_stats.exams_changed(*_counted(instance, 'classroom_id', created))
+
+
+@receiver(post_delete, sender=Exams)
+def uncount_exam(sender, instance, **kwargs):
+    weekly_stats.exams_changed(
+        removed=[(instance.classroom_id, instance.date)])
+
+
+@receiver(post_save, sender=ScheduleEntry)
+@receiver(post_delete, sender=ScheduleEntry)
+def recount_lessons(sender, instance, **kwargs):
+    today = date.today()
+    previous = _previous(instance, 'classroom_id')
+    if previous is not None and previous != instance.classroom_id:
+        weekly_stats.timetable_changed(previous, today)
+    weekly_stats.timetable_changed(instance.classroom_id, today)
+
+
+@receiver(post_save, sender=StudentProfile)
+def move_weekly_stats(sender, instance, created, **kwargs):
+    if not created and _previous(instance, 'classroom_id') != instance.classroom_id:
+        weekly_stats.student_moved(instance.id, date.today())
@@ -0,0 +1,176 @@
+"""Content-addressed storage of exam files and their streaming download.
+
+An upload is hashed while it is written, in chunks, and stored under its
+SHA-256 (``exam_files/ab/cd/abcd....pdf``), so the same file uploaded for
+several exams or classrooms is kept once. The digest doubles as a strong
+ETag.
+
+Downloads go through ``serve``: with ``SENDFILE_HEADER`` set, the web
+server in front of Django sends the file (X-Sendfile for Apache/lighttpd,
+X-Accel-Redirect for nginx); otherwise Django streams it itself, honouring
+single ``Range`` requests so large PDFs can be resumed and paged.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.http import (FileResponse, HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
+from django.utils.deconstruct import deconstructible
+from django.utils.http import content_disposition_header, quote_etag
+
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # the final name comes from the content, see _save
+        return name
+
+    def _save(self, name, content):
+        directory, ext = os.path.dirname(name), os.path.splitext(name)[1]
+        digest = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            # large uploads are already on disk: hash them and move them
+            # into place instead of copying
+            for chunk in content.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+            return self._store(directory, digest.hexdigest(), ext,
+                               content.temporary_file_path(), move=True)
+
+        os.makedirs(self.location, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            return self._store(directory, digest.hexdigest(), ext, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _store(self, directory, digest, ext, source, move=False):
+        name = os.path.join(directory, digest[:2], digest[2:4], digest + ext)
+        path = self.path(name)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if move:
+                # the upload directory may be on another filesystem
+                file_move_safe(source, path)
+            else:
+                os.replace(source, path)
+            if self.file_permissions_mode is not None:
+                os.chmod(path, self.file_permissions_mode)
+
+        return name.replace(os.sep, '/')
+
+
+def exam_storage():
+    return ContentAddressedStorage()
+
+
+# ===== DOWNLOADS =====
+
+def _etag(name):
+    # the digest for content-addressed files, the name for older uploads
+    return quote_etag(os.path.splitext(os.path.basename(name))[0])
+
+
+def _byte_range(header, size):
+    """``(start, end)`` (inclusive) of a single-range header.
+
+    None means "send the whole file"; an unsatisfiable range raises
+    ValueError.
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # "bytes=-500": the last 500 bytes
+        start, end = max(size - int(last), 0), size - 1
+
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request, field, filename):
+    """Response sending the file of ``field`` as ``filename``."""
+    path = field.path
+    etag = _etag(field.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={'ETag': etag})
+
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition_header(False, filename),
+        'Cache-Control': 'private, max-age=86400',
+    }
+
+    if settings.SENDFILE_HEADER:
+        # the web server reads the file and handles Range itself
+        if settings.SENDFILE_HEADER == 'X-Accel-Redirect':
+            location = settings.SENDFILE_URL + field.name
+        else:
+            location = path
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response[settings.SENDFILE_HEADER] = location
+        return response
+
+    size = os.path.getsize(path)
+    byte_range = None
+    # If-Range: only send a part if the client still has this version
+    if request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = _byte_range(request.headers.get('Range', ''), size)
+        except ValueError:
+            return HttpResponse(status=416, headers={
+                'Content-Range': f'bytes */{size}'})
+
+    if byte_range is None:
+        # handed to wsgi.file_wrapper, which lets the server use sendfile()
+        return FileResponse(open(path, 'rb'), filename=filename,
+                            content_type=content_type, headers=headers)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read(path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+        headers=headers,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,211 @@
+"""Background jobs, queued in the database and run by ``run_worker``.
+
+Work that follows a write (aggregates, cache warm-up, e-mails) is queued
+as a Job row inside the transaction of the write: it is never lost, and
+the worker never sees it before the data it reads is committed. With
+TASKS_EAGER the jobs run in-process right after the commit instead (tests,
+development without a worker).
+
+    @task
+    def refresh_grades(student_ids):
+        ...
+
+    refresh_grades.enqueue(student_ids=[3, 7])
+
+Arguments are JSON keyword arguments. A job identical to one that has not
+started yet (same task, same arguments) is not queued twice. A failing job
+is retried with a doubling delay, then kept as failed for the admin.
+"""
+import hashlib
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import aggregates, caching, exam_calendar
+from .models import Absence, Exams, Grade, Job, StudentProfile
+
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+# delay before the first retry, doubled after every failed attempt
+RETRY_DELAY = timedelta(seconds=30)
+
+# a job still running after this long lost its worker and is claimed again
+RUNNING_TIMEOUT = timedelta(minutes=10)
+
+
+def task(func=None, *, max_attempts=3):
+    """Register ``func`` as a job and give it an ``enqueue(**kwargs)`` method."""
+
+    def register(func):
+        name = f"{func.__module__}.{func.__name__}"
+        REGISTRY[name] = func
+        func.max_attempts = max_attempts
+        func.enqueue = lambda **kwargs: enqueue(name, **kwargs)
+        return func
+
+    return register(func) if func else register
+
+
+def _key(name, kwargs):
+    raw = json.dumps([name, kwargs], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def enqueue(name, **kwargs):
+    func = REGISTRY[name]
+    # the same round trip as through the database
+    kwargs = json.loads(json.dumps(kwargs))
+
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: func(**kwargs))
+        return
+
+    Job.objects.bulk_create([Job(
+        name=name,
+        kwargs=kwargs,
+        key=_key(name, kwargs),
+        max_attempts=func.max_attempts,
+    )], ignore_conflicts=True)
+
+
+# ===== WORKER =====
+
+def claim(batch_size):
+    """Mark up to ``batch_size`` due jobs as running and return them.
+
+    Workers skip the rows another worker has locked, so several of them
+    can share the queue.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status=Job.PENDING, run_at__lte=now)
+                    | Q(status=Job.RUNNING, updated_at__lt=now - RUNNING_TIMEOUT))
+            .order_by('run_at')[:batch_size]
+        )
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1, updated_at=now)
+
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.attempts += 1
+    return jobs
+
+
+def run(job):
+    """Run a claimed job; returns whether it succeeded."""
+    try:
+        func = REGISTRY.get(job.name)
+        if func is None:
+            raise LookupError(f"Unknown task {job.name}")
+        func(**job.kwargs)
+    except Exception:
+        logger.exception("Job %s (%s) failed", job.pk, job.name)
+        _failed(job, traceback.format_exc())
+        return False
+
+    job.delete()
+    return True
+
+
+def _failed(job, error):
+    job.error = error
+    if job.attempts < job.max_attempts:
+        job.status = Job.PENDING
+        job.run_at = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+    else:
+        job.status = Job.FAILED
+
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        # an identical job was queued meanwhile and will do the work
+        job.delete()
+
+
+# ===== TASKS =====
+
+@task
+def refresh_grades(student_ids):
+    """Recompute the averages (and so the ranks) of these students."""
+    aggregates.rebuild(student_ids)
+    # pages cached before the rebuild show the old averages
+    caching.grades_changed(student_ids)
+
+
+@task
+def warm_exam_calendar(classroom_id, month):
+    """Rebuild a classroom's calendar month before the students ask for it."""
+    month = exam_calendar.parse_month(month)
+    exam_calendar.get_month_state(classroom_id, month)
+    exam_calendar.get_month_payload(classroom_id, month)
+
+
+def _send(messages):
+    send_mass_mail(
+        [(subject, body, settings.DEFAULT_FROM_EMAIL, [to])
+         for subject, body, to in messages if to],
+        fail_silently=False,
+    )
+
+
+@task
+def notify_grades(grade_ids):
+    grades = (
+        Grade.objects.filter(id__in=grade_ids)
+        .select_related('student__user', 'subject')
+    )
+    _send([
+        (f"Notă nouă la {grade.subject}",
+         f"Ai primit nota {grade.grade} la {grade.subject} "
+         f"pe {grade.date:%d.%m.%Y}.",
+         grade.student.user.email)
+        for grade in grades
+    ])
+
+
+@task
+def notify_absences(absence_ids):
+    absences = (
+        Absence.objects.filter(id__in=absence_ids)
+        .select_related('student__user', 'subject')
+    )
+    _send([
+        ("Absență nouă",
+         f"Ai fost trecut absent la {absence.subject or 'ora'} "
+         f"din {absence.date:%d.%m.%Y}, {absence.time:%H:%M}.",
+         absence.student.user.email)
+        for absence in absences
+    ])
+
+
+@task
+def notify_exam(exam_id):
+    exam = Exams.objects.filter(id=exam_id).select_related('subject').first()
+    if exam is None:
+        return
+
+    emails = (
+        StudentProfile.objects.filter(classroom_id=exam.classroom_id)
+        .values_list('user__email', flat=True)
+    )
+    _send([
+        (f"{exam.type} la {exam.subject}",
+         f"A fost programat(ă) {exam.type} la {exam.subject} "
+         f"pe {exam.date:%d.%m.%Y}.",
+         email)
+        for email in emails
+    ])
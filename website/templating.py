@@ -0,0 +1,33 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+
+class InstrumentedTemplate(Template):
+    """Adds its render time to ``request.template_render_ms``."""
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            if request is not None:
+                elapsed = (time.perf_counter() - started) * 1000
+                request.template_render_ms = (
+                    getattr(request, 'template_render_ms', 0) + elapsed)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, timing every top-level render.
+
+    Included templates are rendered by the engine directly, so they are
+    counted once, inside the template that includes them.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(
+            super().get_template(template_name).template, self)
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from website import seed, weekly_stats
+from website.decorators import ROLE_SESSION_KEY
+from website.models import Classroom, Grade, StudentProfile, WeeklyStats
+
+
+class WebsiteTestCase(TestCase):
+
+    def setUp(self):
+        # the file cache outlives the test database and its ids
+        cache.clear()
+
+
+class WeeklyStatsTests(WebsiteTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.monday = weekly_stats.week_start(date.today())
+        seed.generate(schools=1, classrooms=1, students=2, weeks=1,
+                      prefix='weekly', end=cls.monday - timedelta(days=1))
+        cls.student = StudentProfile.objects.order_by('id').first()
+
+    def grades_counted(self):
+        return WeeklyStats.objects.get(
+            student=self.student, week_start=self.monday).grades
+
+    def test_grades_on_several_days_of_one_week(self):
+        weekly_stats.get(self.student, self.monday)
+        subject = Grade.objects.filter(student=self.student).first().subject
+
+        grades = Grade.objects.bulk_create([
+            Grade(student=self.student, subject=subject, grade=9,
+                  date=self.monday + timedelta(days=offset))
+            for offset in (0, 1, 1)
+        ])
+        weekly_stats.grades_changed(
+            added=[(grade.student_id, grade.date) for grade in grades])
+        shifted = self.grades_counted()
+
+        weekly_stats.refresh(
+            StudentProfile.objects.filter(id=self.student.id), self.monday)
+        self.assertEqual(shifted, self.grades_counted())
+        self.assertEqual(shifted, 3)
+
+        weekly_stats.grades_changed(
+            removed=[(grade.student_id, grade.date) for grade in grades[:2]])
+        self.assertEqual(self.grades_counted(), 1)
+
+
+class ExportTests(WebsiteTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed.generate(schools=2, classrooms=1, students=2, weeks=1,
+                      prefix='export')
+        cls.classroom, cls.other = Classroom.objects.order_by('id')[:2]
+        cls.teacher = cls.classroom.scheduleentry_set.first().teacher
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.teacher.user)
+        session = self.client.session
+        session[ROLE_SESSION_KEY] = 'teacher'
+        session.save()
+
+    def export(self, classroom):
+        return self.client.get(
+            reverse('export-classroom', args=[classroom.id, 'grades']))
+
+    def test_teacher_of_the_classroom(self):
+        self.assertEqual(self.export(self.classroom).status_code, 200)
+
+    def test_other_classroom_is_forbidden(self):
+        self.assertFalse(
+            self.other.scheduleentry_set.filter(teacher=self.teacher).exists())
+        self.assertEqual(self.export(self.other).status_code, 403)
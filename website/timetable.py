@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+from . import caching
+from .models import ScheduleEntry
+
+
+DAYS = [name for weekday, name in ScheduleEntry.WEEKDAYS]
+
+# accepted in imported files, next to DAYS
+ENGLISH_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+# Map subject names to CSS classes
+SUBJECT_COLOR_MAP = {
+    'matematica': 'subject-math',
+    'engleza': 'subject-english',
+    'romana': 'subject-romana',
+    'stiinte': 'subject-science',
+    'istorie': 'subject-history',
+    'fizica': 'subject-physics',
+    'chimie': 'subject-chemistry',
+    'biologie': 'subject-biology',
+    'educatie fizica': 'subject-pe',
+    'informatica': 'subject-informatica',
+}
+
+EMPTY_CELL = {
+    'subject': '-',
+    'teacher': '',
+    'css_class': 'subject-empty',
+    'empty': True
+}
+
+
+def weekday_number(day_name):
+    """0 (Monday) to 4 (Friday) for a day name in either language, else None."""
+    for names in (DAYS, ENGLISH_DAYS):
+        for weekday, name in enumerate(names):
+            if name.lower() == day_name.strip().lower():
+                return weekday
+    return None
+
+
+# ===== LESSON INDEX =====
+
+@lru_cache(maxsize=1024)
+def _lessons(classroom_id, version):
+    by_day = [[] for _ in DAYS]
+    entries = (
+        ScheduleEntry.objects.filter(classroom_id=classroom_id)
+        .select_related('subject', 'teacher__user').order_by('slot')
+    )
+    for entry in entries:
+        by_day[entry.weekday].append(entry)
+    return tuple(tuple(day) for day in by_day)
+
+
+def lessons(classroom_id):
+    """A classroom's lessons, one tuple per weekday (0 = Monday), by slot.
+
+    Kept in process memory per timetable version, so after the first
+    request a lookup costs one cache read; any timetable change (see
+    caching.schedule_changed) makes the next call reload it. The entries
+    are shared between requests: do not modify them.
+    """
+    (version,) = caching.versions([('schedule', classroom_id)])
+    return _lessons(classroom_id, version)
+
+
+def lessons_on(classroom_id, weekday):
+    """The lessons of one weekday (none at the weekend)."""
+    if weekday >= len(DAYS):
+        return ()
+    return lessons(classroom_id)[weekday]
+
+
+def get_timetable(classroom_id):
+    """The classroom's lessons pivoted into rows.
+
+    Each row is one time slot with a cell per day in ``DAYS``.
+    """
+    by_day = lessons(classroom_id)
+    grid = {(entry.slot, entry.weekday): entry
+            for day in by_day for entry in day}
+
+    timetable_data = []
+
+    for slot in sorted({slot for slot, weekday in grid}):
+        start = min(entry.start_time for (entry_slot, weekday), entry
+                    in grid.items() if entry_slot == slot)
+        # Format time for display
+        start_hour = start.hour
+        end_hour = start_hour + 1
+
+        row = {
+            'time': f"{start_hour:02d}:00 - {end_hour:02d}:00",
+            'cells': []
+        }
+
+        for weekday in range(len(DAYS)):
+            entry = grid.get((slot, weekday))
+
+            if entry is None:
+                row['cells'].append(dict(EMPTY_CELL))
+                continue
+
+            teacher = entry.teacher.user
+            row['cells'].append({
+                'subject': entry.subject.name,
+                'teacher': f"{teacher.first_name} {teacher.last_name}",
+                'css_class': SUBJECT_COLOR_MAP.get(
+                    entry.subject.name.lower(), 'subject-default'),
+                'empty': False
+            })
+
+        timetable_data.append(row)
+
+    return timetable_data
@@ -2,19 +2,29 @@
 from django.contrib import admin
 from django.urls import path
 from django.conf import settings
-from django.conf.urls.static import static
 
 from website import views
 
+# Under an ASGI server (see asgi.py) the dashboard and the exam feed load
+# their independent sections concurrently.
+if settings.ASYNC_VIEWS:
+    student_main = views.student_main_async
+    student_calendar_exams = views.student_calendar_exams_async
+else:
+    student_main = views.student_main
+    student_calendar_exams = views.student_calendar_exams
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
     path('login/', views.login_user, name='login'),
     path('logout/', views.logout_user, name='logout'),
-    path('student-page/', views.student_main, name='student-page'),
+    path('student-page/', student_main, name='student-page'),
     path('student-page/grades', views.student_grades, name='student-grades'),
     path('student-page/time_table', views.student_time_table, name='student-table'),
     path('student-page/calendar', views.student_calendar, name='student-calendar'),
+    path('student-page/calendar/exams', student_calendar_exams,
+         name='student-calendar-exams'),
     path('student-page/attendance', views.student_attendance,
          name='student-attendance'),
 
@@ -23,18 +33,25 @@ urlpatterns = [
          views.teacher_classroom_detail, name="teacher-classroom"),
     path("teacher/classroom/<int:class_id>/grade/",
          views.add_grade, name="add-grade"),
+    path("teacher/classroom/<int:class_id>/grade/bulk/",
+         views.add_grades_bulk, name="add-grades-bulk"),
     path("teacher/classroom/<int:class_id>/absence/S",
          views.add_absence, name="add-absence"),
+    path("teacher/classroom/<int:class_id>/absence/rollcall/",
+         views.add_absences_rollcall, name="add-absences-rollcall"),
     path("teacher/classroom/<int:class_id>/exams/",
          views.exam_page, name="add-exam-page"),
     path("teacher/classroom/<int:class_id>/exams/add/",
          views.add_exam, name="add-exam"),
 
+    path("exams/<int:exam_id>/file/", views.exam_file, name="exam-file"),
+
+    path("teacher/classroom/<int:class_id>/export/<str:kind>/",
+         views.export_classroom, name="export-classroom"),
+    path("school/<int:school_id>/export/<str:kind>/",
+         views.export_school, name="export-school"),
+
     path("reviews/", views.review_page, name="reviews-page"),
 
 
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
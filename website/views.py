@@ -1,21 +1,34 @@
 from django.shortcuts import redirect, get_object_or_404
 import json
+import os
+from functools import partial
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from .models import ScheduleEntry, StudentGrade
+from django.db import IntegrityError, transaction
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from .models import ScheduleEntry
 from .models import TeacherProfile
 from .models import Subject
-from .models import SubjectGrade
 from .models import Classroom
 from .models import StudentProfile
 from .models import Grade
 from .models import Absence
 from .models import Exams
+from .models import School
 from datetime import datetime, timedelta
-from website.decorators import student_required, teacher_required
+from website.decorators import resolve_role, student_required, teacher_required
+from website import (aggregates, attendance, caching, dashboard, exam_calendar,
+                     exports, storage, tasks, timetable, weekly_stats)
+from website.catalog import build_catalog
 
 
 def home(request):
@@ -31,13 +44,14 @@ def login_user(request):
 
         if user is not None:
             login(request, user)
+            role = resolve_role(request)
 
-            if hasattr(user, 'teacherprofile'):
+            if role == 'teacher':
                 messages.success(
                     request, "You have been logged in as a Teacher!")
 
                 return redirect('teacher-page')
-            elif hasattr(user, 'studentprofile'):
+            elif role == 'student':
                 messages.success(
                     request, "You have been logged in as a Student!")
                 return redirect('student-page')
@@ -61,153 +75,24 @@ def logout_user(request):
     return redirect('home')
 
 
-@login_required
-@student_required
-def student_main(request):
-    student = request.user.studentprofile
-    classroom = student.classroom
-
+def _student_main_context(student, now, sections):
+    """Template context of the dashboard from the ``dashboard.sections`` results."""
     # ===== DATE AND TIME INFO =====
-    now = datetime.now()
     current_date = now.strftime("%B %d, %Y")
     current_time = now.strftime("%H:%M")
     current_day = now.strftime("%A")
 
-    # ===== TODAY'S CLASSES =====
-    todays_classes = []
-    classes_today = 0
-
-    if classroom:
-        todays_classes = ScheduleEntry.objects.filter(
-            classroom=classroom,
-            day_of_week=current_day
-        ).select_related('subject', 'teacher').order_by('start_time')
-        classes_today = todays_classes.count()
-
-    # ===== UPCOMING EXAMS (NEXT 7 DAYS) =====
-    upcoming_exams_count = 0
-    if classroom:
-        upcoming_exams = Exams.objects.filter(
-            classroom=classroom,
-            date__gte=now.date(),
-            date__lte=now.date() + timedelta(days=7)
-        )
-        upcoming_exams_count = upcoming_exams.count()
+    # ===== TODAY'S CLASSES AND EXAMS =====
+    todays_classes = sections.get('schedule', [])
+    classes_today = len(todays_classes)
+    upcoming_exams_count = sections.get('exams', 0)
 
     # ===== STUDENT GRADES =====
-    student_grades = StudentGrade.objects.filter(
-        student=student
-    ).select_related('grade')
-
-    # Calculate overall average
-    all_grades = [sg.grade.grade for sg in student_grades]
-    average_grade = sum(all_grades) / len(all_grades) if all_grades else 0
-
-    # ===== CALCULATE CLASS RANK =====
-    student_rank = 1
-    total_students = 1
-
-    if classroom:
-        students_in_class = StudentProfile.objects.filter(classroom=classroom)
-        student_averages = []
-
-        for s in students_in_class:
-            s_grades = StudentGrade.objects.filter(
-                student=s).select_related('grade')
-            if s_grades.exists():
-                avg = sum([sg.grade.grade for sg in s_grades]) / \
-                    s_grades.count()
-                student_averages.append((s, avg))
-
-        # Sort by average (highest first)
-        student_averages.sort(key=lambda x: x[1], reverse=True)
-
-        # Find current student's rank
-        for rank, (s, avg) in enumerate(student_averages, 1):
-            if s.id == student.id:
-                student_rank = rank
-                break
+    grades = sections['grades']
+    student_rank, total_students = sections['rank']
 
-        total_students = len(student_averages)
-
-    # ===== FIND BEST SUBJECT =====
-    subject_averages = {}
-
-    for sg in student_grades:
-        try:
-            subject_grade = SubjectGrade.objects.get(grade=sg.grade)
-            subject = subject_grade.subject
-
-            if subject.id not in subject_averages:
-                subject_averages[subject.id] = {
-                    'name': subject.name,
-                    'grades': []
-                }
-            subject_averages[subject.id]['grades'].append(sg.grade.grade)
-        except SubjectGrade.DoesNotExist:
-            continue
-
-    best_subject_name = "N/A"
-    best_subject_avg = 0
-
-    for subject_id, data in subject_averages.items():
-        avg = sum(data['grades']) / len(data['grades'])
-        if avg > best_subject_avg:
-            best_subject_avg = avg
-            best_subject_name = data['name']
-
-    # ===== THIS WEEK STATISTICS =====
-    week_start = now - timedelta(days=now.weekday())  # Monday
-    week_end = week_start + timedelta(days=6)  # Sunday
-
-    # Classes this week (Mon-Fri)
-    classes_this_week = 0
-    if classroom:
-        weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        classes_this_week = ScheduleEntry.objects.filter(
-            classroom=classroom,
-            day_of_week__in=weekdays
-        ).count()
-
-    # Exams this week
-    exams_this_week = 0
-    if classroom:
-        exams_this_week = Exams.objects.filter(
-            classroom=classroom,
-            date__gte=week_start.date(),
-            date__lte=week_end.date()
-        ).count()
-
-    # New grades this week
-    grades_this_week = StudentGrade.objects.filter(
-        student=student,
-        grade__date__gte=week_start.date(),
-        grade__date__lte=week_end.date()
-    ).count()
-
-    # Attendance this week
-    absences_this_week = Absence.objects.filter(
-        student=student,
-        date__gte=week_start.date(),
-        date__lte=week_end.date()
-    ).count()
-
-    # Calculate attendance rate for this week
-    daily_classes = classes_this_week / 5 if classes_this_week > 0 else 0
-    days_passed = (now.date() - week_start.date()).days + 1
-    if days_passed > 5:
-        days_passed = 5  # Cap at weekdays
-
-    total_classes_so_far = daily_classes * days_passed
-
-    if total_classes_so_far > 0:
-        attendance_this_week = int(
-            ((total_classes_so_far - absences_this_week) / total_classes_so_far) * 100)
-    else:
-        attendance_this_week = 100
-
-    # Ensure attendance is between 0 and 100
-    attendance_this_week = max(0, min(100, attendance_this_week))
+    # ===== THIS WEEK =====
+    week = sections['week']
 
     # ===== ANNOUNCEMENTS  =====
     announcements = [
@@ -224,7 +109,7 @@ def student_main(request):
     ]
 
     # ===== PREPARE CONTEXT =====
-    context = {
+    return {
         'student': student,
         'current_date': current_date,
         'current_time': current_time,
@@ -238,30 +123,55 @@ def student_main(request):
         'upcoming_exams_count': upcoming_exams_count,
         'student_rank': student_rank,
         'total_students': total_students,
-        'best_subject_name': best_subject_name,
-        'best_subject_avg': best_subject_avg,
-        'average_grade': average_grade,
+        'best_subject_name': grades['best_subject_name'],
+        'best_subject_avg': grades['best_subject_avg'],
+        'average_grade': grades['average_grade'],
 
         # This week stats
-        'classes_this_week': classes_this_week,
-        'exams_this_week': exams_this_week,
-        'grades_this_week': grades_this_week,
-        'attendance_this_week': attendance_this_week,
+        'classes_this_week': week['classes'],
+        'exams_this_week': week['exams'],
+        'grades_this_week': week['grades'],
+        'attendance_this_week': week['attendance'],
 
         # Announcements
         'announcements': announcements,
     }
 
+
+@login_required
+@student_required
+def student_main(request):
+    student = request.student
+    now = datetime.now()
+
+    sections = {
+        name: build()
+        for name, build in dashboard.sections(student, now).items()
+    }
+    context = _student_main_context(student, now, sections)
+
     return render(request, 'student_main.html', context)
 
 
+@login_required
+@student_required
+async def student_main_async(request):
+    """``student_main`` for ASGI: the dashboard sections load concurrently."""
+    student = request.student
+    now = datetime.now()
+
+    sections = await dashboard.gather(dashboard.sections(student, now))
+    context = _student_main_context(student, now, sections)
+
+    return await sync_to_async(render)(request, 'student_main.html', context)
+
+
 @login_required
 @student_required
 def student_time_table(request):
-    student = request.user.studentprofile
-    classroom = student.classroom
+    student = request.student
 
-    if not classroom:
+    if not student.classroom_id:
         messages.error(request, "You are not assigned to a classroom.")
         return render(request, 'student_timeTable.html', {
             'days': [],
@@ -269,83 +179,10 @@ def student_time_table(request):
             'timetable_data': []
         })
 
-    # Get all schedule entries for this classroom
-    schedule = ScheduleEntry.objects.filter(
-        classroom=classroom
-    ).select_related('subject', 'teacher')
-
-    # Define days
-    days = ["Luni", "Marti", "Miercuri", "Joi", "Vineri"]
-
-    # Get unique time slots
-    time_slots = sorted(set(entry.start_time for entry in schedule))
-
-    print(f"Time slots found: {[str(t) for t in time_slots]}")
-
-    # Map subject names to CSS classes
-    subject_color_map = {
-        'matematica': 'subject-math',
-        'engleza': 'subject-english',
-        'romana': 'subject-romana',
-        'stiinte': 'subject-science',
-        'istorie': 'subject-history',
-        'fizica': 'subject-physics',
-        'chimie': 'subject-chemistry',
-        'biologie': 'subject-biology',
-        'educatie fizica': 'subject-pe',
-        'informatica': 'subject-informatica',
-    }
-
-    # Build the timetable data
-    timetable_data = []
-
-    for time_slot in time_slots:
-        # Format time for display
-        start_hour = time_slot.hour
-        end_hour = start_hour + 1
-        time_display = f"{start_hour:02d}:00 - {end_hour:02d}:00"
-
-        row = {
-            'time': time_display,
-            'cells': []
-        }
-
-        for day in days:
-            # Finding entry for this specific time and day
-            entry = schedule.filter(
-                start_time=time_slot,
-                day_of_week=day
-            ).first()
-
-            if entry:
-                subject_lower = entry.subject.name.lower()
-                css_class = subject_color_map.get(
-                    subject_lower, 'subject-default')
-
-                cell_data = {
-                    'subject': entry.subject.name,
-                    'teacher': f"{entry.teacher.user.first_name} {entry.teacher.user.last_name}",
-                    'css_class': css_class,
-                    'empty': False
-                }
-
-            else:
-                cell_data = {
-                    'subject': '-',
-                    'teacher': '',
-                    'css_class': 'subject-empty',
-                    'empty': True
-                }
-                print(f"{time_display} {day}: Empty")
-
-            row['cells'].append(cell_data)
-
-        timetable_data.append(row)
-
     context = {
         'student': student,
-        'days': days,
-        'timetable_data': timetable_data,
+        'days': timetable.DAYS,
+        'timetable_data': timetable.get_timetable(student.classroom_id),
         'numestudent': student.user.first_name
     }
 
@@ -355,47 +192,140 @@ def student_time_table(request):
 @login_required
 @student_required
 def student_calendar(request):
-    student = request.user.studentprofile
-    exams = Exams.objects.all()
-    dict_exams = [
-        {'id': e.id,
-         'type': e.type,
-         'date': e.date.isoformat(),
-         'teacher': f"{e.teacher.user.first_name} {e.teacher.user.last_name}",
-         'subject': e.subject.name} for e in exams
-    ]
-
-    print(dict_exams)
+    student = request.student
 
     context = {
-        'exams': json.dumps(dict_exams),
+        'current_month': f"{exam_calendar.parse_month(None):%Y-%m}",
         'numestudent': student.user.first_name
     }
 
     return render(request, 'student_calendar.html', context)
 
 
+def _calendar_state(request):
+    # Shared by the ETag and Last-Modified checks so the window is only
+    # aggregated once per request.
+    if not hasattr(request, '_calendar_state'):
+        state = None
+        classroom_id = request.student.classroom_id
+        try:
+            month = exam_calendar.parse_month(request.GET.get('month'))
+        except ValueError:
+            month = None
+
+        if classroom_id and month:
+            count, last_modified = exam_calendar.get_month_state(
+                classroom_id, month)
+            state = (classroom_id, month, count, last_modified)
+
+        request._calendar_state = state
+    return request._calendar_state
+
+
+def _calendar_etag(request):
+    state = _calendar_state(request)
+    if state is None:
+        return None
+    return exam_calendar.month_etag(*state)
+
+
+def _calendar_last_modified(request):
+    state = _calendar_state(request)
+    return state[3] if state else None
+
+
+@login_required
+@student_required
+@condition(etag_func=_calendar_etag, last_modified_func=_calendar_last_modified)
+def student_calendar_exams(request):
+    student = request.student
+
+    try:
+        month = exam_calendar.parse_month(request.GET.get('month'))
+    except ValueError:
+        return JsonResponse({'error': "month must be YYYY-MM"}, status=400)
+
+    # Students without a classroom simply get an empty month.
+    payload = exam_calendar.get_month_payload(student.classroom_id, month)
+
+    return JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
+
+
+@login_required
+@student_required
+async def student_calendar_exams_async(request):
+    """``student_calendar_exams`` for ASGI.
+
+    ``condition`` calls the ETag functions synchronously, which an async
+    view cannot do, so the conditional GET is answered here. On a first
+    load the month state and the exams are fetched concurrently.
+    """
+    student = request.student
+
+    try:
+        month = exam_calendar.parse_month(request.GET.get('month'))
+    except ValueError:
+        return JsonResponse({'error': "month must be YYYY-MM"}, status=400)
+
+    classroom_id = student.classroom_id
+    loaders = {
+        'state': partial(exam_calendar.get_month_state, classroom_id, month),
+    }
+    revalidating = ('HTTP_IF_NONE_MATCH' in request.META
+                    or 'HTTP_IF_MODIFIED_SINCE' in request.META)
+    if not revalidating:
+        loaders['payload'] = partial(
+            exam_calendar.get_month_payload, classroom_id, month)
+    loaded = await dashboard.gather(loaders)
+
+    etag = last_modified = None
+    if classroom_id:
+        count, modified = loaded['state']
+        etag = quote_etag(
+            exam_calendar.month_etag(classroom_id, month, count, modified))
+        if modified:
+            last_modified = int(modified.timestamp())
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        payload = loaded.get('payload') or await sync_to_async(
+            exam_calendar.get_month_payload)(classroom_id, month)
+        response = JsonResponse(
+            payload, json_dumps_params={'separators': (',', ':')})
+
+    if etag:
+        response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    return response
+
+
 @login_required
 @student_required
 def student_attendance(request):
-    student = request.user.studentprofile
+    student = request.student
 
     absente = Absence.objects.filter(
         student=student
-    )
+    ).select_related('subject', 'recorded_by__user')
 
     absente_dict = [{
         'note': a.note,
         'date': a.date.isoformat(),
-        'name': f"{a.subject.name}",
-        'teacher': f"{a.recorded_by.user.first_name} {a.recorded_by.user.last_name}"}
+        'name': a.subject.name if a.subject else '',
+        'teacher': (f"{a.recorded_by.user.first_name} {a.recorded_by.user.last_name}"
+                    if a.recorded_by else '')}
         for a in absente
     ]
 
+    stats = attendance.get_stats(student)
+
     context = {
-        'total_absences': 100,
-        'monthly_absences': 7,
-        'most_missed_subject': "romana",
+        'total_absences': stats['total'],
+        'monthly_absences': stats['monthly'],
+        'most_missed_subject': stats['most_missed_subject'],
+        'subject_stats': stats['per_subject'],
         'absences': absente_dict
     }
     return render(request, 'student_attendance.html', context)
@@ -405,53 +335,31 @@ def student_attendance(request):
 @student_required
 def student_grades(request):
     try:
-        student = request.user.studentprofile
-
-        # Get all grades for this student
-        student_grades = StudentGrade.objects.filter(
-            student=student
-        ).select_related('grade')
+        student = request.student
 
-        student_classRoom = student.classroom
+        # Get all grades for this student, already ordered by subject
+        student_grades = Grade.objects.for_student(
+            student
+        ).filter(subject__isnull=False).select_related('subject')
 
         # Organize grades by subject
         subjects_dict = {}
 
-        student_subjects = ScheduleEntry.objects.filter(
-            classroom=student_classRoom
-        )
+        for grade_obj in student_grades:
+            subject = grade_obj.subject
 
-        student_subjects = list(student_subjects)
-
-        student_subjects_dicts = [
-            {'id': subj.id, 'name': subj.subject.name} for subj in student_subjects
-        ]
-
-        for student_grade in student_grades:
-            grade_obj = student_grade.grade
-
-            # Get the subject through SubjectGrade
-            try:
-                subject_grade = SubjectGrade.objects.get(grade=grade_obj)
-                subject = subject_grade.subject
-
-                # Initialize subject in dictionary if not exists
-                if subject.id not in subjects_dict:
-                    subjects_dict[subject.id] = {
-                        'id': subject.id,
-                        'name': subject.name,
-                        'code': f'SUB{subject.id}',
-                        'teacher': 'N/A',  # We'll add this next
-                        'grades': []
-                    }
-
-                # Add grade to the subject
-                subjects_dict[subject_grade.subject.id]['grades'].append(
-                    grade_obj)
+            # Initialize subject in dictionary if not exists
+            if subject.id not in subjects_dict:
+                subjects_dict[subject.id] = {
+                    'id': subject.id,
+                    'name': subject.name,
+                    'code': f'SUB{subject.id}',
+                    'teacher': 'N/A',  # We'll add this next
+                    'grades': []
+                }
 
-            except SubjectGrade.DoesNotExist:
-                # Skip if no subject is linked to this grade
-                continue
+            # Add grade to the subject
+            subjects_dict[subject.id]['grades'].append(grade_obj)
 
         for subject_id in subjects_dict.keys():
             grade_dict = [
@@ -459,34 +367,31 @@ def student_grades(request):
             ]
             subjects_dict[subject_id]['grades'] = grade_dict
 
-        # Get teacher names for each subject
-        for subject_id, subject_data in subjects_dict.items():
-            try:
-                subject = Subject.objects.get(id=subject_id)
-
-                # Get teacher who teaches this subject
-                teacher_profile = TeacherProfile.objects.filter(
-                    subjects=subject).first()
-
-                if teacher_profile:
-                    subject_data['teacher'] = f"{teacher_profile.user.first_name} {teacher_profile.user.last_name}"
+        # Get teacher names for each subject (the first teacher of each
+        # subject, loaded in one query)
+        teachers = {}
+        teaching = TeacherProfile.subjects.through.objects.filter(
+            subject_id__in=subjects_dict
+        ).select_related('teacherprofile__user').order_by('teacherprofile_id')
+        for link in teaching:
+            teachers.setdefault(link.subject_id, link.teacherprofile.user)
 
-                grades_list = subject_data['grades']
+        averages = aggregates.subject_averages([student.id])[student.id]
 
-                for grade in grades_list:
-                    grade['date'] = grade['date'].isoformat()
+        for subject_id, subject_data in subjects_dict.items():
+            subject_data['average'] = round(
+                averages.get(subject_id, {}).get('average', 0), 2)
 
-                subject_data['grades'] = grades_list
+            teacher_user = teachers.get(subject_id)
+            if teacher_user:
+                subject_data['teacher'] = f"{teacher_user.first_name} {teacher_user.last_name}"
 
-            except Subject.DoesNotExist:
-                pass
+            for grade in subject_data['grades']:
+                grade['date'] = grade['date'].isoformat()
 
         # Convert dictionary to list
         subjects_list = list(subjects_dict.values())
 
-        print("aici")
-        print(subjects_list)
-
         # Prepare context
         context = {
             'subjects': subjects_list,
@@ -506,10 +411,8 @@ def student_grades(request):
 
 @login_required
 def teacher_main(request):
-    try:
-        teacher_profile = TeacherProfile.objects.get(user=request.user)
-    except TeacherProfile.DoesNotExist:
-        teacher_profile = None
+    resolve_role(request)
+    teacher_profile = request.teacher
 
     classrooms = Classroom.objects.filter(
         scheduleentry__teacher=teacher_profile).distinct()
@@ -523,43 +426,24 @@ def teacher_main(request):
 @teacher_required
 def teacher_classroom_detail(request, class_id):
     classroom = Classroom.objects.get(id=class_id)
-    teacher = TeacherProfile.objects.get(user=request.user)
-
-    students = StudentProfile.objects.filter(classroom=classroom)
-    subjects = teacher.subjects.all()
-
-    catalog = []
-
-    for student in students:
+    teacher = request.teacher
 
-        row = {
-            "student": student,
-            "subjects": []
-        }
-
-        for subject in subjects:
-
-            grades = (
-                Grade.objects
-                .filter(studentgrade__student=student,
-                        subjectgrade__subject=subject)
-                .select_related("exam")
-            )
-
-            row["subjects"].append({
-                "subject": subject,
-                "grades": grades
-            })
+    students = list(
+        StudentProfile.objects
+        .filter(classroom=classroom)
+        .select_related("user")
+    )
+    subjects = list(teacher.subjects.all())
 
-        catalog.append(row)
+    catalog = build_catalog(classroom, students, subjects)
 
     absences = Absence.objects.filter(
         student__classroom=classroom
-    ).select_related("student", "subject", "recorded_by")
+    ).select_related("student__user", "subject", "recorded_by__user")
 
     exams = Exams.objects.filter(
         classroom=classroom,
-        subject__in=teacher.subjects.all()
+        subject__in=subjects
     ).select_related("subject").order_by("-date")
 
     return render(request, "teacher_classroom.html", {
@@ -577,7 +461,7 @@ def teacher_classroom_detail(request, class_id):
 @teacher_required
 def add_grade(request, class_id):
     if request.method == "POST":
-        teacher = TeacherProfile.objects.get(user=request.user)
+        teacher = request.teacher
         classroom = Classroom.objects.get(id=class_id)
 
         student_id = request.POST["student"]
@@ -606,14 +490,18 @@ def add_grade(request, class_id):
                 messages.error(request, "Evaluare invalidă.")
                 return redirect("teacher-classroom", class_id=class_id)
 
-        grade_obj = Grade.objects.create(
-            date=date_obj,
-            grade=grade_value,
-            exam=exam
-        )
+        with transaction.atomic():
+            grade_obj = Grade.objects.create(
+                student=student,
+                subject=subject,
+                date=date_obj,
+                grade=grade_value,
+                exam=exam
+            )
 
-        StudentGrade.objects.create(student=student, grade=grade_obj)
-        SubjectGrade.objects.create(subject=subject, grade=grade_obj)
+            # a single grade is folded in right away; only the e-mail waits
+            aggregates.record_grade(grade_obj)
+            tasks.notify_grades.enqueue(grade_ids=[grade_obj.id])
 
         messages.success(request, "Nota a fost adăugată cu succes!")
         return redirect("teacher-classroom", class_id=class_id)
@@ -622,11 +510,96 @@ def add_grade(request, class_id):
     return redirect("teacher-classroom", class_id=class_id)
 
 
+@login_required
+@teacher_required
+def add_grades_bulk(request, class_id):
+    if request.method != "POST":
+        messages.error(request, "Eroare la adăugarea notelor.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    teacher = request.teacher
+
+    try:
+        exam_id = int(request.POST["exam"])
+    except (KeyError, ValueError):
+        messages.error(request, "Evaluare invalidă.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    exam = (
+        Exams.objects
+        .filter(id=exam_id, teacher=teacher, classroom_id=class_id)
+        .select_related("subject")
+        .first()
+    )
+    if not exam:
+        messages.error(request, "Evaluare invalidă.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    # validare: verificăm că profesorul predă materia
+    if not teacher.subjects.filter(id=exam.subject_id).exists():
+        messages.error(request, "Nu predai această materie.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    date_str = request.POST.get("date")
+    try:
+        date_obj = (datetime.strptime(date_str, "%Y-%m-%d").date()
+                    if date_str else exam.date)
+    except ValueError:
+        messages.error(request, "Data invalidă.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    # one "grade_<student id>" field per student; empty ones are skipped
+    student_ids = StudentProfile.objects.filter(
+        classroom_id=class_id).values_list("id", flat=True)
+
+    grades = []
+    for student_id in student_ids:
+        value = request.POST.get(f"grade_{student_id}", "").strip()
+        if not value:
+            continue
+
+        try:
+            grade_value = int(value)
+        except ValueError:
+            grade_value = 0
+        if not 1 <= grade_value <= 10:
+            messages.error(request, "Notele trebuie să fie între 1 și 10.")
+            return redirect("teacher-classroom", class_id=class_id)
+
+        grades.append(Grade(
+            student_id=student_id,
+            subject_id=exam.subject_id,
+            exam=exam,
+            evaluation_type=exam.type,
+            date=date_obj,
+            grade=grade_value
+        ))
+
+    if not grades:
+        messages.error(request, "Nu ai completat nicio notă.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    student_ids = sorted(grade.student_id for grade in grades)
+
+    with transaction.atomic():
+        Grade.objects.bulk_create(grades)
+        weekly_stats.grades_changed(
+            added=[(grade.student_id, grade.date) for grade in grades])
+        tasks.refresh_grades.enqueue(student_ids=student_ids)
+        tasks.notify_grades.enqueue(grade_ids=[grade.id for grade in grades])
+
+    # bulk_create does not send post_save
+    caching.grades_changed(student_ids)
+
+    messages.success(request, f"Au fost adăugate {len(grades)} note!")
+    return redirect("teacher-classroom", class_id=class_id)
+
+
 @login_required
 @teacher_required
 def add_absence(request, class_id):
     if request.method == "POST":
-        teacher = TeacherProfile.objects.get(user=request.user)
+        teacher = request.teacher
         classroom = Classroom.objects.get(id=class_id)
 
         student_id = request.POST["student"]
@@ -651,14 +624,21 @@ def add_absence(request, class_id):
         if subject_id:
             subject = Subject.objects.get(id=subject_id)
 
-        Absence.objects.create(
-            student=student,
-            subject=subject,
-            date=date_obj,
-            time=time_obj,
-            recorded_by=teacher,
-            note=note
-        )
+        try:
+            with transaction.atomic():
+                absence = Absence.objects.create(
+                    student=student,
+                    subject=subject,
+                    date=date_obj,
+                    time=time_obj,
+                    recorded_by=teacher,
+                    note=note
+                )
+                tasks.notify_absences.enqueue(absence_ids=[absence.id])
+        except IntegrityError:
+            messages.error(
+                request, "Elevul are deja o absenta la aceasta ora.")
+            return redirect("teacher-classroom", class_id=class_id)
 
         messages.success(request, "Absenta a fost inregistrata!")
         return redirect("teacher-classroom", class_id=class_id)
@@ -667,10 +647,93 @@ def add_absence(request, class_id):
     return redirect("teacher-classroom", class_id=class_id)
 
 
+@login_required
+@teacher_required
+def add_absences_rollcall(request, class_id):
+    if request.method != "POST":
+        messages.error(request, "Eroare la adaugarea absentelor.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    teacher = request.teacher
+
+    try:
+        date_obj = datetime.strptime(request.POST["date"], "%Y-%m-%d").date()
+        time_obj = datetime.strptime(request.POST["time"], "%H:%M").time()
+    except (KeyError, ValueError):
+        messages.error(request, "Data sau ora invalida.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    weekday = date_obj.weekday()
+
+    if weekday >= 5:
+        messages.error(request, "Nu poti adauga absente in weekend.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    # the lesson must exist in the classroom's timetable and be taught by
+    # the teacher doing the roll-call
+    entry = ScheduleEntry.objects.filter(
+        classroom_id=class_id,
+        weekday=weekday,
+        start_time=time_obj,
+        teacher=teacher,
+    ).first()
+
+    if not entry:
+        messages.error(request, "Nu ai ora cu aceasta clasa la data si ora alese.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    try:
+        selected = [int(value) for value in request.POST.getlist("absent")]
+    except ValueError:
+        messages.error(request, "Elevi selectati invalizi.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    absent_ids = set(
+        StudentProfile.objects
+        .filter(classroom_id=class_id, id__in=selected)
+        .values_list("id", flat=True)
+    )
+
+    if not absent_ids:
+        messages.error(request, "Nu ai selectat niciun elev absent.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    note = request.POST.get("note", "").strip()
+
+    try:
+        with transaction.atomic():
+            absences = Absence.objects.bulk_create([
+                Absence(
+                    student_id=student_id,
+                    subject_id=entry.subject_id,
+                    date=date_obj,
+                    time=time_obj,
+                    recorded_by=teacher,
+                    note=note
+                )
+                for student_id in absent_ids
+            ])
+            weekly_stats.absences_changed(
+                added=[(student_id, date_obj) for student_id in absent_ids])
+            tasks.notify_absences.enqueue(
+                absence_ids=[absence.id for absence in absences])
+    except IntegrityError:
+        messages.error(
+            request, "Unii elevi au deja absenta la aceasta ora. Nu s-a salvat nimic.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    # bulk_create does not send post_save
+    caching.absences_changed(absent_ids)
+
+    messages.success(
+        request, f"Au fost inregistrate {len(absent_ids)} absente!")
+    return redirect("teacher-classroom", class_id=class_id)
+
+
 @login_required
 @teacher_required
 def exam_page(request, class_id):
-    teacher = TeacherProfile.objects.get(user=request.user)
+    teacher = request.teacher
     classroom = Classroom.objects.get(id=class_id)
 
     subjects = teacher.subjects.all()
@@ -679,7 +742,7 @@ def exam_page(request, class_id):
         teacher=teacher,
         classroom=classroom,
         subject__in=subjects
-    ).order_by("-date")
+    ).select_related("subject").order_by("-date")
 
     return render(request, "exam_page.html", {
         "teacher": teacher,
@@ -693,7 +756,7 @@ def exam_page(request, class_id):
 @login_required
 @teacher_required
 def add_exam(request, class_id):
-    teacher = TeacherProfile.objects.get(user=request.user)
+    teacher = request.teacher
     classroom = Classroom.objects.get(id=class_id)
 
     if request.method == "POST":
@@ -717,14 +780,19 @@ def add_exam(request, class_id):
         from datetime import datetime
         exam_date = datetime.strptime(date_str, "%Y-%m-%d").date()
 
-        Exams.objects.create(
-            type=exam_type,
-            date=exam_date,
-            classroom=classroom,
-            teacher=teacher,
-            subject=subject,
-            file=uploaded
-        )
+        with transaction.atomic():
+            exam = Exams.objects.create(
+                type=exam_type,
+                date=exam_date,
+                classroom=classroom,
+                teacher=teacher,
+                subject=subject,
+                file=uploaded
+            )
+
+            tasks.warm_exam_calendar.enqueue(
+                classroom_id=classroom.id, month=f"{exam_date:%Y-%m}")
+            tasks.notify_exam.enqueue(exam_id=exam.id)
 
         messages.success(request, "Evaluarea a fost adăugată cu succes!")
         return redirect("add-exam-page", class_id=class_id)
@@ -732,7 +800,77 @@ def add_exam(request, class_id):
     return redirect("add-exam-page", class_id=class_id)
 
 
+@login_required
+def exam_file(request, exam_id):
+    exam = get_object_or_404(
+        Exams.objects.select_related("classroom", "subject"), id=exam_id)
+    if not exam.file or not exam.file.storage.exists(exam.file.name):
+        raise Http404
+
+    role = resolve_role(request)
+    if role == "student":
+        allowed = request.student.classroom_id == exam.classroom_id
+    elif role == "teacher":
+        teacher = request.teacher
+        allowed = (
+            exam.teacher_id == teacher.id
+            or exam.classroom.form_teacher_id == teacher.id
+            or ScheduleEntry.objects.filter(
+                classroom_id=exam.classroom_id, teacher=teacher).exists()
+        )
+    else:
+        allowed = request.user.is_staff
+
+    if not allowed:
+        raise Http404
+
+    extension = os.path.splitext(exam.file.name)[1]
+    filename = f"{exam.type}-{exam.subject.name}-{exam.date}{extension}"
+    return storage.serve(request, exam.file, filename)
+
+
 @login_required
 @teacher_required
 def review_page(request):
     return render(request, "review_page.html")
+
+
+@login_required
+@teacher_required
+def export_classroom(request, class_id, kind):
+    classroom = get_object_or_404(Classroom, id=class_id)
+    teacher = request.teacher
+    fmt = request.GET.get("format", "csv")
+
+    if kind not in exports.KINDS or fmt not in exports.FORMATS:
+        messages.error(request, "Export invalid.")
+        return redirect("teacher-classroom", class_id=class_id)
+
+    # only the form teacher and the teachers of the classroom
+    if not (
+        classroom.form_teacher_id == teacher.id
+        or ScheduleEntry.objects.filter(
+            classroom_id=classroom.id, teacher=teacher).exists()
+    ):
+        raise PermissionDenied
+
+    filters = {"student__classroom": classroom}
+
+    # dirigintele exporta tot catalogul, ceilalti profesori doar materiile lor
+    if classroom.form_teacher_id != teacher.id:
+        filters["subject__in"] = teacher.subjects.all()
+
+    return exports.export_response(
+        kind, fmt, f"clasa-{classroom.name}", **filters)
+
+
+@staff_member_required
+def export_school(request, school_id, kind):
+    school = get_object_or_404(School, id=school_id)
+    fmt = request.GET.get("format", "csv")
+
+    if kind not in exports.KINDS or fmt not in exports.FORMATS:
+        raise Http404("Export invalid.")
+
+    return exports.export_response(
+        kind, fmt, f"scoala-{school.id}", student__classroom__school=school)
@@ -0,0 +1,169 @@
+"""Per-student snapshot of the dashboard's "This week" panel.
+
+``refresh`` builds the WeeklyStats rows of a week with one grouped query
+per kind of data (run by ``refresh_weekly_stats`` at the start of every
+week). Between two refreshes, the hooks below (called from signals.py
+and from the bulk writes that bypass signals) shift the counters of the
+rows they touch, so the dashboard reads the panel in one indexed query.
+
+Attendance is exact: the snapshot keeps the slots of the timetable, and
+``attendance`` compares the lessons already held with the absences.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import (Absence, Exams, Grade, ScheduleEntry, StudentProfile,
+                     WeeklyStats)
+
+
+# students refreshed per round of queries
+CHUNK_SIZE = 2000
+
+COUNTERS = ['exams', 'grades', 'absences']
+
+
+def week_start(day):
+    """Monday of the week of ``day``."""
+    return day - timedelta(days=day.weekday())
+
+
+def _lessons(classroom_ids):
+    """``{classroom id: [[weekday, "HH:MM"], ...]}`` from the timetables."""
+    lessons = defaultdict(list)
+    rows = (
+        ScheduleEntry.objects.filter(classroom_id__in=classroom_ids)
+        .values_list('classroom_id', 'weekday', 'start_time')
+        .order_by('classroom_id', 'weekday', 'slot')
+    )
+    for classroom_id, weekday, start_time in rows:
+        lessons[classroom_id].append([weekday, f"{start_time:%H:%M}"])
+    return lessons
+
+
+def _counts(queryset, field, start):
+    return dict(
+        queryset.filter(date__gte=start, date__lt=start + timedelta(days=7))
+        .values(field).annotate(count=Count('id')).order_by()
+        .values_list(field, 'count')
+    )
+
+
+def _build(chunk, start):
+    """Upsert the rows of ``(student id, classroom id)`` pairs; returns them."""
+    student_ids = [student_id for student_id, classroom_id in chunk]
+    classroom_ids = {classroom_id for student_id, classroom_id in chunk
+                     if classroom_id}
+
+    lessons = _lessons(classroom_ids)
+    exams = _counts(Exams.objects.filter(classroom_id__in=classroom_ids),
+                    'classroom_id', start)
+    grades = _counts(Grade.objects.filter(student_id__in=student_ids),
+                     'student_id', start)
+    absences = _counts(Absence.objects.filter(student_id__in=student_ids),
+                       'student_id', start)
+
+    return WeeklyStats.objects.bulk_create(
+        [
+            WeeklyStats(
+                student_id=student_id,
+                week_start=start,
+                lessons=lessons.get(classroom_id, []),
+                exams=exams.get(classroom_id, 0),
+                grades=grades.get(student_id, 0),
+                absences=absences.get(student_id, 0),
+            )
+            for student_id, classroom_id in chunk
+        ],
+        update_conflicts=True,
+        unique_fields=['student', 'week_start'],
+        update_fields=['lessons', *COUNTERS, 'updated_at'],
+    )
+
+
+def refresh(students, start):
+    """(Re)build the rows of ``students`` (a queryset) for the week of ``start``."""
+    start = week_start(start)
+    students = students.order_by('id').values_list('id', 'classroom_id')
+
+    total, last_id = 0, 0
+    while True:
+        chunk = list(students.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if chunk:
+            total += len(_build(chunk, start))
+        # a short chunk is the last one
+        if len(chunk) < CHUNK_SIZE:
+            return total
+        last_id = chunk[-1][0]
+
+
+def get(student, today):
+    """The student's row for the week of ``today``, built if missing."""
+    start = week_start(today)
+    stats = WeeklyStats.objects.filter(student=student, week_start=start).first()
+    if stats is None:
+        [stats] = _build([(student.id, student.classroom_id)], start)
+    return stats
+
+
+def attendance(stats, now):
+    """Percentage of the lessons held so far this week that were attended."""
+    today = (now.date() - stats.week_start).days
+    time = f"{now:%H:%M}"
+    held = sum(1 for weekday, start in stats.lessons
+               if weekday < today or (weekday == today and start <= time))
+    if not held:
+        return 100
+    return max(0, min(100, int((held - stats.absences) / held * 100)))
+
+
+# ===== INCREMENTAL HOOKS =====
+
+def _shift(counter, lookup, added, removed):
+    """Count ``added`` and uncount ``removed`` ``(id, date)`` pairs.
+
+    ``lookup`` leads from a WeeklyStats row to the id. Rows that do not
+    exist yet are left alone: ``get`` builds them from scratch, already
+    counting the change.
+    """
+    # net change per row first: several days of one week hit the same row
+    changes = Counter()
+    for scope_id, day in added:
+        changes[(scope_id, week_start(day))] += 1
+    for scope_id, day in removed:
+        changes[(scope_id, week_start(day))] -= 1
+
+    # then one UPDATE per week and delta
+    groups = defaultdict(list)
+    for (scope_id, start), delta in changes.items():
+        if scope_id and delta:
+            groups[(start, delta)].append(scope_id)
+
+    for (start, delta), ids in groups.items():
+        WeeklyStats.objects.filter(
+            week_start=start, **{f"{lookup}__in": ids}
+        ).update(**{counter: Greatest(F(counter) + delta, 0)})
+
+
+def grades_changed(added=(), removed=()):
+    """Grades given as ``(student id, date)`` pairs were added or removed."""
+    _shift('grades', 'student_id', added, removed)
+
+
+def absences_changed(added=(), removed=()):
+    _shift('absences', 'student_id', added, removed)
+
+
+def exams_changed(added=(), removed=()):
+    """Exams given as ``(classroom id, date)`` pairs were added or removed."""
+    _shift('exams', 'student__classroom_id', added, removed)
+
+
+def timetable_changed(classroom_id, today):
+    refresh(StudentProfile.objects.filter(classroom_id=classroom_id), today)
+
+
+def student_moved(student_id, today):
+    refresh(StudentProfile.objects.filter(id=student_id), today)